@@ -0,0 +1,223 @@
+# Runs the performance benchmarks of TMLang, offline, and writes their results as JSON:
+# the parsing of generated programs of 10 to 10⁶ transitions by interpret_from_code, their validation by
+# verify_validity, the speed of perform_computation_from_tape on the examples (busy beavers included),
+# the cost of #runsteps against the length of the tape, and the construction of transition diagrams
+# With --baseline, the results are compared with the ones of a previous run, and the script exits with status 1
+# if a benchmark got slower by more than the tolerance, so that regressions are caught
+# Usage: python benchmarks/benchmark_suite.py [--output results.json] [--baseline baseline.json] [--quick]
+
+from itertools import chain
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from turing_machine import SimplifiedTuringMachine, RunBudget
+from TMLang_interpreter import (
+    interpret_from_code,
+    read_lines,
+    parse_definition,
+    evaluate_run_arguments,
+    RUN_FINAL_STATE_ONLY_COMMAND,
+)
+from parser_benchmark import generate_program
+
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+PROGRAM_SIZES = [10, 10**2, 10**3, 10**4, 10**5, 10**6]  # number of transitions of the programs parsed and validated
+DIAGRAM_SIZES = [10, 10**2, 10**3, 10**4]
+TAPE_LENGTHS = [10, 10**2, 10**3, 10**4]  # number of cells of the tapes swept by #runsteps
+QUICK_MAX_SIZE = 10**4  # with --quick, the benchmarks of bigger programs, diagrams and tapes are skipped
+RUN_STEPS = 10**6  # budget of the computations of the examples
+REPEATS = 5  # number of samples of each benchmark, the best one being kept
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# Moves right across the 1's of its tape, so that #runsteps shows a tape as long as the one it's given
+SWEEPING_PROGRAM = """name 'Sweeping Machine'
+blank 0
+initial s0
+final {halt}
+startprogr
+    s0, 1: s0, 1, R
+    s0, 0: halt, 0, N
+endprogr
+#runsteps '{tape}' steps=0
+"""
+
+
+def measure(function) -> float:
+    """Returns the time taken by function(), in seconds, as the best of REPEATS samples,
+    each sample calling it enough times to last at least 0.2 seconds, so that short benchmarks aren't noisy"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEATS, number=number)) / number
+
+
+def consume(outputs):
+    for _ in outputs:
+        pass
+
+
+def generated_machine(number_of_transitions: int) -> SimplifiedTuringMachine:
+    name, blank_symbol, initial_state, final_states, transition_function, _, _ = parse_definition(
+        read_lines(generate_program(number_of_transitions))
+    )
+    return SimplifiedTuringMachine(name, transition_function, initial_state, final_states, blank_symbol)
+
+
+def example_runs():
+    """Yields the name, the machine and the starting tape of the first #run of each example"""
+    for example in sorted(os.listdir(EXAMPLES_DIRECTORY)):
+        with open(os.path.join(EXAMPLES_DIRECTORY, example)) as file:
+            code_lines = read_lines(file)
+            name, blank_symbol, initial_state, final_states, transition_function, _, _ = parse_definition(code_lines)
+            starting_tape = ""
+            for _, code_line in code_lines:
+                if code_line.startswith(RUN_FINAL_STATE_ONLY_COMMAND + " "):
+                    starting_tape = evaluate_run_arguments(code_line[len(RUN_FINAL_STATE_ONLY_COMMAND) :].strip())[0]
+                    break
+        turing_machine = SimplifiedTuringMachine(name, transition_function, initial_state, final_states, blank_symbol)
+        yield example, turing_machine, starting_tape
+
+
+def benchmark_parsing(sizes: list[int]):
+    """Yields the name and the results of each benchmark of interpret_from_code and verify_validity"""
+    for size in sizes:
+        program = "".join(generate_program(size))
+        seconds = measure(lambda: consume(interpret_from_code(program, render_image=False)))
+        yield f"parse {size} transitions", {"seconds": seconds, "us_per_transition": seconds / size * 1e6}
+
+    for size in sizes:
+        turing_machine = generated_machine(size)
+        transition_function = turing_machine.transition_function
+        seconds = measure(
+            lambda: transition_function.verify_validity(
+                turing_machine.possible_states, turing_machine.alphabet, turing_machine.final_states
+            )
+        )
+        yield f"validate {size} transitions", {"seconds": seconds, "us_per_transition": seconds / size * 1e6}
+
+
+def benchmark_runs():
+    """Yields the name and the results of the computation of each example, stopped after RUN_STEPS steps"""
+    for example, turing_machine, starting_tape in example_runs():
+        budget = RunBudget(max_steps=RUN_STEPS)
+        seconds = measure(lambda: consume(turing_machine.perform_computation_from_tape(starting_tape, budget=budget)))
+        steps = turing_machine.configuration.num_step - 1
+        yield f"run {example}", {"seconds": seconds, "steps": steps, "steps_per_second": steps / seconds}
+
+
+def benchmark_runsteps(tape_lengths: list[int]):
+    """Yields the name and the results of #runsteps on tapes of each length, every step showing the whole tape"""
+    for tape_length in tape_lengths:
+        program = SWEEPING_PROGRAM.replace("{tape}", "1" * tape_length)
+        seconds = measure(lambda: consume(interpret_from_code(program, render_image=False)))
+        steps = tape_length + 1
+        yield f"runsteps tape of {tape_length} cells", {"seconds": seconds, "us_per_step": seconds / steps * 1e6}
+
+
+def benchmark_diagrams(sizes: list[int]):
+    """Yields the name and the results of the construction of the transition diagram of machines of each size"""
+    for size in sizes:
+        turing_machine = generated_machine(size)
+        seconds = measure(turing_machine.get_transition_diagram)
+        yield f"diagram {size} transitions", {"seconds": seconds}
+
+
+def describe(results: dict) -> str:
+    details = [f"{results['seconds'] * 1000:>12.3f} ms"]
+    if "steps_per_second" in results:
+        details.append(f"{results['steps_per_second']:>14,.0f} steps/s")
+    if "us_per_transition" in results:
+        details.append(f"{results['us_per_transition']:>10.3f} µs/transition")
+    if "us_per_step" in results:
+        details.append(f"{results['us_per_step']:>10.3f} µs/step")
+    return " ".join(details)
+
+
+def compare(benchmarks: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Prints the time of each benchmark against the one of the baseline,
+    and returns the names of the ones slower by more than tolerance (a fraction of the baseline time)"""
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline (ms)':>14} {'now (ms)':>12} {'change':>8}")
+    for name, results in benchmarks.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]["seconds"], results["seconds"]
+        change = now / before - 1
+        regressed = change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<40} {before * 1000:>14.3f} {now * 1000:>12.3f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the performance benchmarks of TMLang")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=DEFAULT_OUTPUT,
+        help=f"the JSON file the results are written to (default: {DEFAULT_OUTPUT})",
+    )
+    parser.add_argument("-b", "--baseline", default=None, help="the JSON results of a previous run to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"the fraction by which a benchmark can get slower than the baseline (default: {DEFAULT_TOLERANCE})",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help=f"if used, the benchmarks bigger than {QUICK_MAX_SIZE} are skipped"
+    )
+    args = parser.parse_args()
+
+    max_size = QUICK_MAX_SIZE if args.quick else float("inf")
+    program_sizes = [size for size in PROGRAM_SIZES if size <= max_size]
+    diagram_sizes = [size for size in DIAGRAM_SIZES if size <= max_size]
+    tape_lengths = [tape_length for tape_length in TAPE_LENGTHS if tape_length <= max_size]
+
+    benchmarks = {}
+    for name, results in chain(
+        benchmark_parsing(program_sizes),
+        benchmark_runs(),
+        benchmark_runsteps(tape_lengths),
+        benchmark_diagrams(diagram_sizes),
+    ):
+        benchmarks[name] = results
+        print(f"{name:<40} {describe(results)}", flush=True)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "benchmarks": benchmarks,
+            },
+            file,
+            indent=4,
+        )
+    print(f"\nResults written to '{args.output}'")
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["benchmarks"]
+        regressions = compare(benchmarks, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks got slower than the baseline by more than {args.tolerance:.0%}:")
+            for name in regressions:
+                print(f" - {name}")
+            sys.exit(1)
+        print(f"\nNo benchmark got slower than the baseline by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Compares the compiled engine with the generated one (engine=generated), on the examples run from a blank tape
+# and on random machines of 10 to 1000 states, checking that both engines give the same results
+# Usage: python benchmarks/engine_benchmark.py [number of steps]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from turing_machine import SimplifiedTuringMachine, RunBudget
+from TMLang_interpreter import read_lines, parse_definition
+from codegen import GeneratedMachine, load_function
+
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+DEFAULT_NUMBER_OF_STEPS = 10**7
+RANDOM_MACHINES = [(10, 2), (100, 2), (1000, 2), (10, 16)]  # (number of states, number of symbols)
+SEED = 0
+
+
+def example_machines():
+    """Yields the name and the machine of each example"""
+    for example in sorted(os.listdir(EXAMPLES_DIRECTORY)):
+        with open(os.path.join(EXAMPLES_DIRECTORY, example)) as file:
+            name, blank_symbol, initial_state, final_states, transition_function, _, _ = parse_definition(
+                read_lines(file)
+            )
+        yield example, SimplifiedTuringMachine(name, transition_function, initial_state, final_states, blank_symbol)
+
+
+def random_machine(number_of_states: int, number_of_symbols: int) -> SimplifiedTuringMachine:
+    """Returns a machine with a transition for every state and symbol, which never halts"""
+    states = [f"q{i}" for i in range(number_of_states)]
+    symbols = [str(i) for i in range(number_of_symbols)]
+    transition_function = {
+        (state, symbol): (random.choice(states), random.choice(symbols), random.choice("LR"))
+        for state in states
+        for symbol in symbols
+    }
+    return SimplifiedTuringMachine(f"Random {number_of_states}x{number_of_symbols}", transition_function, "q0", (), "0")
+
+
+def time_run(turing_machine: SimplifiedTuringMachine, engine, number_of_steps: int) -> tuple[float, list[str]]:
+    """Returns the time taken by the computation from a blank tape, in seconds, and its results"""
+    start = time.perf_counter()
+    results = list(
+        turing_machine.perform_computation_from_tape(
+            "", budget=RunBudget(max_steps=number_of_steps), engine=engine, loop_detection_steps=0
+        )
+    )
+    return time.perf_counter() - start, results
+
+
+def main():
+    number_of_steps = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUMBER_OF_STEPS
+    random.seed(SEED)
+    machines = list(example_machines()) + [
+        (f"random {states} states, {symbols} symbols", random_machine(states, symbols))
+        for states, symbols in RANDOM_MACHINES
+    ]
+
+    print(
+        f"{'machine':<40} {'steps':>10} {'codegen (ms)':>13} {'compiled (s)':>13} {'generated (s)':>14} {'speedup':>8}"
+    )
+    for name, turing_machine in machines:
+        load_function.cache_clear()
+        start = time.perf_counter()
+        engine = GeneratedMachine(turing_machine.compiled)
+        codegen_time = time.perf_counter() - start
+
+        compiled_time, compiled_results = time_run(turing_machine, turing_machine.compiled, number_of_steps)
+        generated_time, generated_results = time_run(turing_machine, engine, number_of_steps)
+        assert compiled_results == generated_results, f"the engines give different results for {name}"
+
+        steps = turing_machine.configuration.num_step - 1
+        speedup = compiled_time / generated_time if generated_time else float("inf")
+        print(
+            f"{name:<40} {steps:>10} {codegen_time * 1000:>13.1f} {compiled_time:>13.3f} {generated_time:>14.3f} {speedup:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
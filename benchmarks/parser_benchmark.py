@@ -0,0 +1,43 @@
+# Measures the time taken to parse generated TMLang programs, from 10³ to 10⁶ transition lines
+# The time per line should stay about the same as the programs grow, the parser being linear
+# Usage: python benchmarks/parser_benchmark.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from TMLang_interpreter import read_lines, parse_definition
+
+SIZES = [10**3, 10**4, 10**5, 10**6]
+
+
+def generate_program(number_of_transitions: int):
+    """Yields the lines of a program whose transition function has number_of_transitions entries"""
+    yield "// generated program\n"
+    yield "name 'Generated Machine'\n"
+    yield "blank 0\n"
+    yield "initial q0\n"
+    yield "final {halt}\n"
+    yield "startprogr\n"
+    number_of_states = number_of_transitions // 2
+    for i in range(number_of_transitions):
+        state, symbol = divmod(i, 2)
+        next_state = f"q{state + 1}" if state + 1 < number_of_states else "halt"
+        yield f"    q{state}, {symbol} : {next_state}, {1 - symbol}, R  // transition {i}\n"
+    yield "endprogr\n"
+
+
+def main():
+    print(f"{'transitions':>12} {'time (s)':>10} {'µs/line':>8}")
+    for size in SIZES:
+        start = time.perf_counter()
+        *_, transition_function, _, line_number = parse_definition(read_lines(generate_program(size)))
+        duration = time.perf_counter() - start
+        assert len(transition_function) == size
+        print(f"{size:>12} {duration:>10.3f} {duration / (line_number + 1) * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Measures the startup time of the CLI, by running it repeatedly in verify mode on the examples
+# and by timing the import of each of its modules in a fresh interpreter
+# Usage: python benchmarks/startup_benchmark.py [number of runs]
+
+import os
+import subprocess
+import sys
+import time
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+MODULES = ["turing_machine", "TMLang_interpreter", "TMLang"]
+DEFAULT_NUMBER_OF_RUNS = 20
+
+
+def time_command(command: list[str], number_of_runs: int) -> float:
+    """Returns the best wall-clock time of the command over number_of_runs runs, in seconds"""
+    best = float("inf")
+    for _ in range(number_of_runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SOURCE_DIRECTORY, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    number_of_runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUMBER_OF_RUNS
+    baseline = time_command([sys.executable, "-c", "pass"], number_of_runs)
+    print(f"{'python -c pass':<48} {baseline * 1000:>8.1f} ms")
+
+    for module in MODULES:
+        duration = time_command([sys.executable, "-c", f"import {module}"], number_of_runs)
+        print(f"{'import ' + module:<48} {duration * 1000:>8.1f} ms")
+
+    for example in sorted(os.listdir(EXAMPLES_DIRECTORY)):
+        command = [sys.executable, "TMLang.py", "--verify", "--no-cache", os.path.join(EXAMPLES_DIRECTORY, example)]
+        duration = time_command(command, number_of_runs)
+        print(f"{'TMLang.py --verify ' + example:<48} {duration * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
-from turing_machine import TuringMachineError
+from turing_machine import TuringMachineError, RunBudget, MAX_NUMBER_OF_STEPS, DEFAULT_CHECKPOINT_INTERVAL
 from TMLang_interpreter import interpret_from_code, TMLangSyntaxError, TMLangValueError
+from machine_cache import MachineCache, CACHE_DIRECTORY
 import argparse
 import sys
 
+ERRORS_REPORTED = (TMLangSyntaxError, TMLangValueError, TuringMachineError)
+
+
+def describe_error(error: Exception) -> str:
+    """Returns the message printed for an error of the program interpreted"""
+    for error_type in ERRORS_REPORTED:
+        if isinstance(error, error_type):
+            return f"{error_type.__name__}: {error}"
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -32,27 +42,106 @@ def main():
         help="when rendering a transition diagram, the program will automatically open the generated image",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--max-steps",
+        type=int,
+        default=MAX_NUMBER_OF_STEPS,
+        help=f"the default number of steps after which a computation is stopped, 0 for no limit (default: {MAX_NUMBER_OF_STEPS})",
+    )
 
-    with open(args.filename, "r") as file:
-        code = file.read()
+    parser.add_argument(
+        "--max-time",
+        type=float,
+        default=0,
+        help="the default time in seconds after which a computation is stopped, 0 for no limit (default: 0)",
+    )
+
+    parser.add_argument(
+        "--max-cells",
+        type=int,
+        default=0,
+        help="the default number of tape cells a computation can use, 0 for no limit (default: 0)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"if used, the machine defined and its diagrams aren't loaded from nor stored in the cache ({CACHE_DIRECTORY})",
+    )
+
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=DEFAULT_CHECKPOINT_INTERVAL,
+        help=f"the minimum time in seconds between two checkpoints of a #run with the checkpoint option (default: {DEFAULT_CHECKPOINT_INTERVAL})",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="if used, every #run command is profiled like #profile",
+    )
+
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="if used, the file is interpreted again each time it changes, only executing again the commands affected",
+    )
+
+    parser.add_argument(
+        "-c",
+        "--concurrent",
+        action="store_true",
+        help="if used, the commands are executed concurrently (the computations by a pool of processes), "
+        "their output being printed in the same order",
+    )
+
+    args = parser.parse_args()
+    if args.watch and args.concurrent:  # a watched program executes its commands one at a time, to reuse their output
+        parser.error("argument -c/--concurrent: not allowed with argument -w/--watch")
+    budget = RunBudget(
+        max_steps=args.max_steps or None, max_time=args.max_time or None, max_cells=args.max_cells or None
+    )
 
     if args.output is not None:
         sys.stdout = open(args.output, "w", encoding="utf-8")
 
-    try:
-        for i in interpret_from_code(
-            code, render_image=(not args.verify), automatically_open_image_generated=args.auto_open
-        ):
-            if not args.verify:
-                print(i)
-
-    except TMLangSyntaxError as error:
-        print(f"TMLangSyntaxError: {error}")
-    except TMLangValueError as error:
-        print(f"TMLangValueError: {error}")
-    except TuringMachineError as error:
-        print(f"TuringMachineError: {error}")
+    settings = dict(
+        render_image=(not args.verify),
+        automatically_open_image_generated=args.auto_open,
+        budget=budget,
+        cache=(None if args.no_cache else MachineCache()),
+        checkpoint_interval=args.checkpoint_interval,
+        profile=args.profile,
+    )
+
+    if args.watch:
+        from watch import WatchedProgram  # imported lazily, as it is only used in watch mode
+
+        program = WatchedProgram(args.filename, **settings)
+        try:
+            for _ in program.changes():
+                try:
+                    for i in program.interpret():
+                        if not args.verify:
+                            print(i)
+                except ERRORS_REPORTED as error:  # the program is still watched, until it is fixed
+                    print(describe_error(error))
+                print(program.summary(), flush=True)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # The file is read line by line while it is interpreted
+    with open(args.filename, "r") as file:
+        try:
+            for i in interpret_from_code(file, concurrent=args.concurrent, **settings):
+                if not args.verify:
+                    print(i)
+
+        except ERRORS_REPORTED as error:
+            print(describe_error(error))
 
 
 if __name__ == "__main__":
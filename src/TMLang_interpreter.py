@@ -1,10 +1,25 @@
-from turing_machine import SimplifiedTuringMachine, TuringMachine, TuringMachineError
-from typing import Generator
+from turing_machine import (
+    SimplifiedTuringMachine,
+    TuringMachine,
+    TuringMachineError,
+    RunBudget,
+    StepTrace,
+    ValidationIssue,
+    InvalidTuringMachineError,
+    TABLE_CHUNK_LINES,
+)
+from macro_machine import MacroMachine, DEFAULT_BLOCK_SIZE
+from batch import run_batch
+from machine_cache import MachineCache
+from itertools import islice
+from typing import Generator, Iterable, Iterator
 from os import get_terminal_size, startfile
+from io import StringIO
 import re
 
 STRING_INDICATOR = "'"
 COMMENT_INDICATOR = "//"
+TRANSITION_PATTERN = re.compile("\\s+.+,.+:.+,.+,.+")
 
 MACHINE_NAME_KEYWORD = "name"
 BLANK_SYMBOL_KEYWORD = "blank"
@@ -15,12 +30,51 @@ START_TRANSITION_FUNCTION_KEYWORD = "startprogr"
 END_TRANSITION_FUNCTION_KEYWORD = "endprogr"
 
 GET_FORMAL_DEFINITION_COMMAND = "#printdef"
+CHECK_DEFINITION_COMMAND = "#checkdef"
+MINIMIZE_COMMAND = "#minimize"
 RUN_WITH_ALL_STEPS_COMMAND = "#runsteps"
 RUN_FINAL_STATE_ONLY_COMMAND = "#run"
+RUN_BATCH_COMMAND = "#runbatch"
+PROFILE_COMMAND = "#profile"
 RENDER_GRAPHICAL_TRANSITION_DIAGRAM_COMMAND = "#renderdiagram"
 
 DEFAULT_STATE_DIAGRAM_FORMAT = "pdf"
 
+# Options that can follow the starting tape of #run and #runsteps, written as option=value
+OPTION_SEPARATOR = "="
+MAX_STEPS_OPTION = "steps"
+MAX_TIME_OPTION = "time"
+MAX_CELLS_OPTION = "cells"
+
+# Options selecting the steps shown by #runsteps
+EVERY_OPTION = "every"
+STATE_CHANGES_OPTION = "changes"
+LAST_OPTION = "last"
+WINDOW_OPTION = "window"
+YES_VALUE = "yes"
+NO_VALUE = "no"
+
+# Options selecting the engine of #run
+ENGINE_OPTION = "engine"
+BLOCK_SIZE_OPTION = "block"
+COMPILED_ENGINE = "compiled"
+MACRO_ENGINE = "macro"
+GENERATED_ENGINE = "generated"
+LOCKSTEP_ENGINE = "lockstep"  # only for #runbatch
+
+# Option giving the number of worker processes of #runbatch
+PROCESSES_OPTION = "processes"
+
+# Option giving the file to which #run records a binary trace of every step
+RECORD_OPTION = "record"
+
+# Options selecting the transitions shown by #printdef, a page at a time
+ROWS_OPTION = "rows"
+PAGE_OPTION = "page"
+
+# Option giving the file to which #run saves checkpoints of its computation, which is resumed from it if it exists
+CHECKPOINT_OPTION = "checkpoint"
+
 
 def get_separator() -> str:
     """Returns a separator with the same width as the terminal window"""
@@ -62,6 +116,258 @@ def evaluate_set(set_str: str) -> tuple:
     return tuple(output_list)
 
 
+def evaluate_run_arguments(argument: str) -> tuple:
+    """Takes the argument of a run command and returns the starting tape and a dict of the options following it
+    If the input is invalid, it returns None"""
+    # ex: evaluate_run_arguments("'111' steps=10000 time=2") gives ('111', {'steps': '10000', 'time': '2'})
+    argument = argument.strip()
+    if argument.startswith(STRING_INDICATOR):
+        end_of_tape = argument.find(STRING_INDICATOR, len(STRING_INDICATOR))
+        if end_of_tape == -1:
+            return None
+        starting_tape = argument[len(STRING_INDICATOR) : end_of_tape]
+        options = argument[end_of_tape + len(STRING_INDICATOR) :].split()
+    else:
+        starting_tape, *options = argument.split() or [""]
+
+    options_dict = evaluate_options(options)
+    if options_dict is None:
+        return None
+
+    return starting_tape, options_dict
+
+
+def evaluate_options(options: list[str]) -> dict | None:
+    """Takes a list of options written as option=value and returns them as a dict
+    If the input is invalid, it returns None"""
+    options_dict = {}
+    for option in options:
+        name, separator, value = option.partition(OPTION_SEPARATOR)
+        if not (separator and name and value):
+            return None
+        options_dict[name] = value
+
+    return options_dict
+
+
+def evaluate_limit(value: str, value_type: type) -> int | float | None:
+    """Evaluates the value of a budget option, 0 meaning no limit
+    If the input is invalid, it raises a ValueError"""
+    limit = value_type(value)
+    if limit < 0:
+        raise ValueError(f"negative limit {limit}")
+    return limit or None
+
+
+def get_run_budget(options: dict, default_budget: RunBudget, line_number: int) -> RunBudget:
+    """Returns the budget of a run command, from its options and the default budget"""
+    budget = RunBudget(
+        max_steps=default_budget.max_steps,
+        max_time=default_budget.max_time,
+        max_cells=default_budget.max_cells,
+    )
+    for name, value in options.items():
+        try:
+            if name == MAX_STEPS_OPTION:
+                budget.max_steps = evaluate_limit(value, int)
+            elif name == MAX_TIME_OPTION:
+                budget.max_time = evaluate_limit(value, float)
+            elif name == MAX_CELLS_OPTION:
+                budget.max_cells = evaluate_limit(value, int)
+            else:
+                raise TMLangSyntaxError(f"line {line_number + 1}: unknown option '{name}'")
+        except ValueError:
+            raise TMLangValueError(f"line {line_number + 1}: invalid value '{value}' for option '{name}'")
+
+    return budget
+
+
+def get_step_trace(options: dict, line_number: int) -> StepTrace:
+    """Returns the steps shown by a #runsteps command from its options, which are removed from options"""
+    trace = StepTrace()
+    for name in (EVERY_OPTION, STATE_CHANGES_OPTION, LAST_OPTION, WINDOW_OPTION):
+        if name not in options:
+            continue
+        value = options.pop(name)
+        try:
+            if name == STATE_CHANGES_OPTION:
+                if value not in (YES_VALUE, NO_VALUE):
+                    raise ValueError(f"expected {YES_VALUE} or {NO_VALUE}")
+                trace.state_changes = value == YES_VALUE
+            else:
+                setattr(trace, name, evaluate_limit(value, int))  # 0 means every step, or the whole tape
+        except ValueError:
+            raise TMLangValueError(f"line {line_number + 1}: invalid value '{value}' for option '{name}'")
+
+    return trace
+
+
+def get_run_engine(options: dict, turing_machine: TuringMachine, line_number: int):
+    """Returns the engine of a #run command from its options, which are removed from options"""
+    engine_name = options.pop(ENGINE_OPTION, COMPILED_ENGINE)
+    block_size = options.pop(BLOCK_SIZE_OPTION, None)
+
+    if engine_name in (COMPILED_ENGINE, GENERATED_ENGINE) and block_size is not None:
+        raise TMLangValueError(
+            f"line {line_number + 1}: option '{BLOCK_SIZE_OPTION}' requires {ENGINE_OPTION}={MACRO_ENGINE}"
+        )
+
+    if engine_name == COMPILED_ENGINE:
+        return turing_machine.compiled
+
+    if engine_name == GENERATED_ENGINE:
+        from codegen import GeneratedMachine  # imported lazily, as most computations use the compiled engine
+
+        return GeneratedMachine(turing_machine.compiled)
+
+    if engine_name == MACRO_ENGINE:
+        try:
+            block_size = int(block_size) if block_size is not None else DEFAULT_BLOCK_SIZE
+            return MacroMachine(turing_machine.compiled, block_size=block_size)
+        except (ValueError, TuringMachineError):
+            raise TMLangValueError(
+                f"line {line_number + 1}: invalid value '{block_size}' for option '{BLOCK_SIZE_OPTION}'"
+            )
+
+    raise TMLangValueError(f"line {line_number + 1}: unknown engine '{engine_name}'")
+
+
+def get_trace_recorder(options: dict, turing_machine: TuringMachine, line_number: int):
+    """Returns the TraceWriter recording a #run command to the file given by its options, which is removed from options,
+    or None if the computation isn't recorded"""
+    path = options.pop(RECORD_OPTION, None)
+    if path is None:
+        return None
+    if ENGINE_OPTION in options or BLOCK_SIZE_OPTION in options:
+        raise TMLangValueError(f"line {line_number + 1}: option '{RECORD_OPTION}' can't be used with an engine")
+    if not path:
+        raise TMLangValueError(f"line {line_number + 1}: invalid value '{path}' for option '{RECORD_OPTION}'")
+    from trace_file import TraceWriter  # imported lazily, as most computations aren't recorded
+
+    return TraceWriter(path, turing_machine.compiled)
+
+
+def get_checkpointer(options: dict, turing_machine: TuringMachine, line_number: int, interval: float | None):
+    """Returns the Checkpointer of a #run command from the file given by its options, which is removed from options,
+    or None if the computation isn't checkpointed"""
+    path = options.pop(CHECKPOINT_OPTION, None)
+    if path is None:
+        return None
+    if not path:
+        raise TMLangValueError(f"line {line_number + 1}: invalid value '{path}' for option '{CHECKPOINT_OPTION}'")
+    from checkpoint import Checkpointer  # imported lazily, as most computations aren't checkpointed
+
+    if interval is None:
+        return Checkpointer(path, turing_machine)
+    return Checkpointer(path, turing_machine, interval=interval)
+
+
+def get_batch_processes(options: dict, line_number: int) -> int | None:
+    """Returns the number of worker processes of a #runbatch command from its options, which is removed from options
+    None means one process per CPU"""
+    processes = options.pop(PROCESSES_OPTION, None)
+    if processes is None:
+        return None
+    try:
+        if int(processes) < 1:
+            raise ValueError(f"invalid number of processes {processes}")
+        return int(processes)
+    except ValueError:
+        raise TMLangValueError(f"line {line_number + 1}: invalid value '{processes}' for option '{PROCESSES_OPTION}'")
+
+
+def get_table_page(options: dict, number_of_transitions: int, line_number: int) -> tuple[int, int | None]:
+    """Returns the first transition shown by #printdef and the one after the last, from its options
+    (None meaning up to the end of the transition table)"""
+    rows = options.pop(ROWS_OPTION, "0")
+    page = options.pop(PAGE_OPTION, None)
+    for name in options:
+        raise TMLangSyntaxError(f"line {line_number + 1}: unknown option '{name}'")
+
+    try:
+        rows = evaluate_limit(rows, int)
+    except ValueError:
+        raise TMLangValueError(f"line {line_number + 1}: invalid value '{rows}' for option '{ROWS_OPTION}'")
+    if rows is None:
+        if page is not None:
+            raise TMLangValueError(f"line {line_number + 1}: option '{PAGE_OPTION}' requires option '{ROWS_OPTION}'")
+        return 0, None
+
+    try:
+        page = int(page or 1)
+        if page < 1:
+            raise ValueError(f"invalid page {page}")
+    except ValueError:
+        raise TMLangValueError(f"line {line_number + 1}: invalid value '{page}' for option '{PAGE_OPTION}'")
+    number_of_pages = max(1, -(-number_of_transitions // rows))
+    if page > number_of_pages:
+        raise TMLangValueError(
+            f"line {line_number + 1}: page {page} doesn't exist, the transition table has {number_of_pages} pages of {rows} transitions"
+        )
+
+    if number_of_pages == 1:  # every transition is shown
+        return 0, None
+    return (page - 1) * rows, page * rows
+
+
+def profile_computation(
+    turing_machine: TuringMachine, starting_tape: str, options: dict, budget: RunBudget, line_number: int
+) -> Generator[str]:
+    """Returns a generator that yields the result of the computation from starting_tape, and then its profile
+    The computation isn't watched for cycles, so that every step is counted until it halts or exceeds its budget"""
+    for name in (ENGINE_OPTION, BLOCK_SIZE_OPTION, RECORD_OPTION, CHECKPOINT_OPTION):
+        if name in options:
+            raise TMLangValueError(f"line {line_number + 1}: option '{name}' can't be used when profiling")
+    from profiler import Profiler  # imported lazily, as most computations aren't profiled
+
+    profiler = Profiler(turing_machine.compiled)
+    yield from turing_machine.perform_computation_from_tape(
+        starting_tape=starting_tape,
+        all_steps=False,
+        budget=get_run_budget(options, budget, line_number),
+        loop_detection_steps=0,
+        engine=profiler,
+    )
+    yield "\n" + profiler.report(turing_machine)
+
+
+def render_transition_diagram(
+    turing_machine: TuringMachine, image_formats: list[str], cache: MachineCache | None
+) -> list[str]:
+    """Renders the transition diagram of the machine in each format, concurrently, and returns the files rendered
+    The files rendered before from the same diagram are copied from the cache, instead of being rendered again"""
+    import graphviz  # imported lazily, like in TuringMachine.get_transition_diagram
+    from concurrent.futures import ThreadPoolExecutor  # imported lazily, as it imports logging
+
+    transition_diagram_graph = turing_machine.get_transition_diagram()
+    source_file_name = transition_diagram_graph.save()  # the graphviz source is only written once for every format
+    key = cache.diagram_key(transition_diagram_graph.source) if cache is not None else None
+
+    def render(image_format: str) -> str:
+        file_name = f"{source_file_name}.{image_format}"
+        if key is not None and cache.load_diagram(key, image_format, file_name):
+            return file_name
+        file_name = graphviz.render("dot", image_format, source_file_name)
+        if key is not None:
+            cache.store_diagram(key, image_format, file_name)
+        return file_name
+
+    # each format is rendered by its own dot process, so threads are enough to render them in parallel
+    with ThreadPoolExecutor(max_workers=len(image_formats)) as executor:
+        return list(executor.map(render, image_formats))
+
+
+def read_batch_inputs(file_path: str, line_number: int) -> list[str]:
+    """Returns the starting tapes listed in a batch file, one per line (blank lines and comments being ignored)"""
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines()
+    except OSError as error:
+        raise TMLangValueError(f"line {line_number + 1}: cannot read batch file '{file_path}' ({error.strerror})")
+
+    return [evaluate_str(line) for line in map(remove_comments_and_blanks, lines) if not is_blank(line)]
+
+
 def is_blank(line: str) -> bool:
     """returns True if the line can be ignored by the interpreter (i.e. it is blank)"""
     return line.strip() == ""
@@ -70,23 +376,34 @@ def is_blank(line: str) -> bool:
 def remove_comments_and_blanks(line: str) -> str:
     """Removes the comment contained in the line (if there is one)
     It also removes all the blanks at the the end of the line"""
-    return re.sub(f"{COMMENT_INDICATOR}.*", "", line).rstrip()
-
-
-def interpret_from_code(code: str, render_image=True, automatically_open_image_generated=False) -> Generator[str]:
-    code_lines = code.splitlines()
+    return line.partition(COMMENT_INDICATOR)[0].rstrip()
+
+
+def read_lines(code: str | Iterable[str], start: int = 0) -> Iterator[tuple[int, str]]:
+    """Returns an iterator over the lines of the code (a string, a file object or any iterator of lines),
+    as (line_number, line without comments and blanks at the end), starting from the line number start"""
+    if isinstance(code, str):
+        code = StringIO(code)
+    code = iter(code)
+    for _ in islice(code, start):  # the lines before start aren't even stripped
+        pass
+    return enumerate(map(remove_comments_and_blanks, code), start)
+
+
+def parse_definition(code_lines: Iterator[tuple[int, str]]) -> tuple[str, str, str, tuple, dict, dict, int]:
+    """Reads the definition of the Turing machine from the lines of the code, in a single pass
+    Returns (machine_name, blank_symbol, initial_state, final_states, transition_function, line_numbers, line_number),
+    line_numbers mapping each transition's (state, symbol) and the keys of ValidationIssue to the line defining them,
+    and line_number being the line of endprogr, the lines after it being left in code_lines"""
+    line_numbers = {}
     blank_symbol = None
     initial_state = None
     final_states = None
     machine_name = None
-    line_number = 0  # line_number is a 0-based index
+    line_number = -1  # line_number is a 0-based index
 
     # We first of all interpret the values defined with the keywords: name, initial, final, and blank
-    for line_number in range(len(code_lines)):
-        if all(x is not None for x in [blank_symbol, initial_state, final_states, machine_name]):
-            break
-
-        code_line = remove_comments_and_blanks(code_lines[line_number])
+    for line_number, code_line in code_lines:
         if not is_blank(code_line):
             if code_line.startswith(MACHINE_NAME_KEYWORD):
                 argument = code_line[len(MACHINE_NAME_KEYWORD) :].strip()
@@ -95,102 +412,312 @@ def interpret_from_code(code: str, render_image=True, automatically_open_image_g
             elif code_line.startswith(BLANK_SYMBOL_KEYWORD):
                 argument = code_line[len(BLANK_SYMBOL_KEYWORD) :].strip()
                 blank_symbol = evaluate_str(argument)
+                line_numbers[ValidationIssue.BLANK_SYMBOL] = line_number
 
             elif code_line.startswith(INITIAL_STATE_KEYWORD):
                 argument = code_line[len(INITIAL_STATE_KEYWORD) :].strip()
                 initial_state = evaluate_str(argument)
+                line_numbers[ValidationIssue.INITIAL_STATE] = line_number
 
             elif code_line.startswith(FINAL_STATES_KEYWORD):
                 argument = code_line[len(FINAL_STATES_KEYWORD) :].strip()
                 final_states = evaluate_set(argument)
                 if final_states is None:
                     raise TMLangSyntaxError(f"line {line_number + 1}: invalid set syntax '{argument}'")
+                line_numbers[ValidationIssue.FINAL_STATES] = line_number
 
             else:
                 raise TMLangSyntaxError(f"line {line_number + 1}: invalid syntax")
 
+        if all(x is not None for x in [blank_symbol, initial_state, final_states, machine_name]):
+            break
+
     if any(x is None for x in [blank_symbol, initial_state, final_states, machine_name]):
         raise TMLangValueError("Not all necessary values were precised (blank, initial, final, name)")
 
-    code_line = remove_comments_and_blanks(code_lines[line_number])
-    while not code_line == START_TRANSITION_FUNCTION_KEYWORD:
+    for line_number, code_line in code_lines:
+        if code_line == START_TRANSITION_FUNCTION_KEYWORD:
+            break
         if not is_blank(code_line):
-            raise TMLangSyntaxError(f"line {line_number}: expected {START_TRANSITION_FUNCTION_KEYWORD}")
-        line_number += 1
-        code_line = remove_comments_and_blanks(code_lines[line_number])
-
-    line_number += 1
-    code_line = remove_comments_and_blanks(code_lines[line_number])
+            raise TMLangSyntaxError(f"line {line_number + 1}: expected {START_TRANSITION_FUNCTION_KEYWORD}")
+    else:
+        raise TMLangSyntaxError(f"line {line_number + 1}: expected {START_TRANSITION_FUNCTION_KEYWORD}")
 
     transition_function = {}
 
-    while not code_line == END_TRANSITION_FUNCTION_KEYWORD:
+    for line_number, code_line in code_lines:
+        if code_line == END_TRANSITION_FUNCTION_KEYWORD:
+            break
         if not is_blank(code_line):
-            if re.fullmatch("\\s+.+,.+:.+,.+,.+", code_line):
-                key = tuple(x.strip() for x in code_line.split(":")[0].split(","))
-
-                value = tuple(x.strip() for x in code_line.split(":")[1].split(","))
-                transition_function[key] = value
+            if TRANSITION_PATTERN.fullmatch(code_line):
+                key, value = code_line.split(":", 2)[:2]
+                key = tuple(x.strip() for x in key.split(","))
+                transition_function[key] = tuple(x.strip() for x in value.split(","))
+                line_numbers[key] = line_number
 
             else:
                 raise TMLangSyntaxError(f"line {line_number + 1}: expected {END_TRANSITION_FUNCTION_KEYWORD}")
-        line_number += 1
-        try:
-            code_line = remove_comments_and_blanks(code_lines[line_number])
-        except IndexError:
-            raise TMLangSyntaxError(f"line {line_number}: expected {END_TRANSITION_FUNCTION_KEYWORD}")
-
-    turing_machine_described = SimplifiedTuringMachine(
-        name=machine_name,
-        transition_function=transition_function,
-        blank_symbol=blank_symbol,
-        initial_state=initial_state,
-        final_states=final_states,
+    else:
+        raise TMLangSyntaxError(f"line {line_number + 1}: expected {END_TRANSITION_FUNCTION_KEYWORD}")
+
+    return machine_name, blank_symbol, initial_state, final_states, transition_function, line_numbers, line_number
+
+
+def locate_issues(issues: list[ValidationIssue], line_numbers: dict) -> list[ValidationIssue]:
+    """Sets the line number of each validation issue, from the line numbers given by parse_definition"""
+    for issue in issues:
+        issue.line_number = line_numbers.get(issue.key)
+    return issues
+
+
+def define_machine(code_lines: Iterator[tuple[int, str]]) -> tuple[SimplifiedTuringMachine, int]:
+    """Parses and validates the machine defined by the lines of the code, and returns it along with the line number
+    of endprogr, the lines after it being left in code_lines"""
+    machine_name, blank_symbol, initial_state, final_states, transition_function, line_numbers, line_number = (
+        parse_definition(code_lines)
+    )
+
+    try:
+        turing_machine = SimplifiedTuringMachine(
+            name=machine_name,
+            transition_function=transition_function,
+            blank_symbol=blank_symbol,
+            initial_state=initial_state,
+            final_states=final_states,
+        )
+    except InvalidTuringMachineError as error:  # every error is reported, along with its line
+        raise InvalidTuringMachineError(locate_issues(error.issues, line_numbers))
+    return turing_machine, line_number
+
+
+class ExecutionContext:
+    """
+    What the commands of a program are executed with:
+
+    turing_machine: the machine described by the program, with which the computations are performed
+    displayed_machine: the machine printed and rendered, which #minimize replaces by its minimized version
+    (the computations are still performed by the machine described, so that their results are unchanged)
+    render_image, automatically_open_image_generated, budget, cache, checkpoint_interval and profile:
+    the settings given to interpret_from_code
+    """
+
+    def __init__(
+        self,
+        turing_machine: SimplifiedTuringMachine,
+        render_image=True,
+        automatically_open_image_generated=False,
+        budget: RunBudget | None = None,
+        cache: MachineCache | None = None,
+        checkpoint_interval: float | None = None,
+        profile=False,
+    ):
+        self.turing_machine = turing_machine
+        self.displayed_machine = turing_machine
+        self.render_image = render_image
+        self.automatically_open_image_generated = automatically_open_image_generated
+        self.budget = budget if budget is not None else RunBudget()
+        self.cache = cache
+        self.checkpoint_interval = checkpoint_interval
+        self.profile = profile
+
+
+def execute_command(context: ExecutionContext, line_number: int, code_line: str) -> Generator[str]:
+    """Executes a command of a program (a line after the definition of its machine), yielding its output"""
+    turing_machine_described = context.turing_machine
+    displayed_machine = context.displayed_machine
+    render_image = context.render_image
+    automatically_open_image_generated = context.automatically_open_image_generated
+    budget = context.budget
+    cache = context.cache
+    checkpoint_interval = context.checkpoint_interval
+    profile = context.profile
+
+    if code_line.startswith(GET_FORMAL_DEFINITION_COMMAND):
+        argument = code_line[len(GET_FORMAL_DEFINITION_COMMAND) :].strip()
+        options = evaluate_options(argument.split())
+        if options is None:
+            raise TMLangSyntaxError(f"line {line_number + 1}: invalid options '{argument}'")
+        start, stop = get_table_page(options, len(displayed_machine.transition_function.as_dict()), line_number)
+        # the definition is output in chunks, so that the table of a big machine is never built at once
+        if render_image:  # we don't build the table in verifying mode either, as it's never printed
+            yield from displayed_machine.formal_definition_chunks(start, stop)
+
+    elif code_line == CHECK_DEFINITION_COMMAND:
+        # the missing transitions are only listed now, and output in chunks, as a sparse machine can have millions
+        missing_transitions = map(str, turing_machine_described.missing_transitions())
+        chunk = list(islice(missing_transitions, TABLE_CHUNK_LINES))
+        if not chunk:
+            yield f"Turing machine '{turing_machine_described.name}' has a transition for every state and symbol"
+        while chunk:
+            yield "\n".join(chunk)
+            chunk = list(islice(missing_transitions, TABLE_CHUNK_LINES))
+
+    elif code_line == MINIMIZE_COMMAND:
+        minimization = turing_machine_described.minimize()
+        context.displayed_machine = minimization.turing_machine
+        yield str(minimization)
+
+    elif code_line.startswith(RENDER_GRAPHICAL_TRANSITION_DIAGRAM_COMMAND):
+        argument = code_line[len(RENDER_GRAPHICAL_TRANSITION_DIAGRAM_COMMAND) :].strip()
+        if argument:
+            image_formats = list(dict.fromkeys(argument.split()))
+        else:
+            image_formats = [DEFAULT_STATE_DIAGRAM_FORMAT]
+        if render_image:  # we don't build nor render diagrams in verifying mode
+            for image_format, file_name in zip(
+                image_formats, render_transition_diagram(displayed_machine, image_formats, cache)
+            ):
+                yield f"Transition diagram rendered as {image_format} to file '{file_name}'"
+                if automatically_open_image_generated:
+                    startfile(file_name)
+
+    elif code_line.startswith(RUN_WITH_ALL_STEPS_COMMAND):
+        argument = code_line[len(RUN_WITH_ALL_STEPS_COMMAND) :].strip()
+        run_arguments = evaluate_run_arguments(argument)
+        if run_arguments is None:
+            raise TMLangSyntaxError(f"line {line_number + 1}: invalid run arguments '{argument}'")
+        starting_tape, options = run_arguments
+        trace = get_step_trace(options, line_number)
+        for step in turing_machine_described.perform_computation_from_tape(
+            starting_tape=starting_tape,
+            all_steps=True,
+            budget=get_run_budget(options, budget, line_number),
+            trace=trace,
+        ):
+            yield step
+
+    elif code_line.startswith(PROFILE_COMMAND) or (
+        profile and code_line.startswith(RUN_FINAL_STATE_ONLY_COMMAND) and not code_line.startswith(RUN_BATCH_COMMAND)
+    ):
+        command = PROFILE_COMMAND if code_line.startswith(PROFILE_COMMAND) else RUN_FINAL_STATE_ONLY_COMMAND
+        argument = code_line[len(command) :].strip()
+        run_arguments = evaluate_run_arguments(argument)
+        if run_arguments is None:
+            raise TMLangSyntaxError(f"line {line_number + 1}: invalid run arguments '{argument}'")
+        starting_tape, options = run_arguments
+        yield from profile_computation(turing_machine_described, starting_tape, options, budget, line_number)
+
+    elif code_line.startswith(RUN_BATCH_COMMAND):
+        argument = code_line[len(RUN_BATCH_COMMAND) :].strip()
+        run_arguments = evaluate_run_arguments(argument)
+        if run_arguments is None or not run_arguments[0]:
+            raise TMLangSyntaxError(f"line {line_number + 1}: invalid run arguments '{argument}'")
+        file_path, options = run_arguments
+        starting_tapes = read_batch_inputs(file_path, line_number)
+        if options.get(ENGINE_OPTION) == LOCKSTEP_ENGINE:  # all the inputs are run at once by a single process
+            from lockstep import run_lockstep  # imported lazily, as it imports NumPy
+
+            del options[ENGINE_OPTION]
+            try:
+                results = run_lockstep(
+                    turing_machine_described,
+                    starting_tapes,
+                    budget=get_run_budget(options, budget, line_number),
+                )
+            except TuringMachineError as error:
+                raise TMLangValueError(f"line {line_number + 1}: {error}")
+        else:
+            engine = get_run_engine(options, turing_machine_described, line_number)
+            processes = get_batch_processes(options, line_number)
+            results = run_batch(
+                turing_machine_described,
+                starting_tapes,
+                budget=get_run_budget(options, budget, line_number),
+                engine=engine,
+                processes=processes,
+            )
+        for index, result in enumerate(results):
+            yield result if index == 0 else "\n" + result
+
+    elif code_line.startswith(RUN_FINAL_STATE_ONLY_COMMAND):
+        argument = code_line[len(RUN_FINAL_STATE_ONLY_COMMAND) :].strip()
+        run_arguments = evaluate_run_arguments(argument)
+        if run_arguments is None:
+            raise TMLangSyntaxError(f"line {line_number + 1}: invalid run arguments '{argument}'")
+        starting_tape, options = run_arguments
+        recorder = get_trace_recorder(options, turing_machine_described, line_number)
+        checkpointer = get_checkpointer(options, turing_machine_described, line_number, checkpoint_interval)
+        engine = get_run_engine(options, turing_machine_described, line_number)
+        for step in turing_machine_described.perform_computation_from_tape(
+            starting_tape=starting_tape,
+            all_steps=False,
+            budget=get_run_budget(options, budget, line_number),
+            engine=engine,
+            recorder=recorder,
+            checkpointer=checkpointer,
+        ):
+            yield step
+        if recorder is not None:
+            yield f"Computation recorded to file '{recorder.path}'"
+        if checkpointer is not None and checkpointer.resumed_step is not None:
+            yield f"Computation resumed from the checkpoint of step {checkpointer.resumed_step} in file '{checkpointer.path}'"
+        if checkpointer is not None and checkpointer.saved_step is not None:
+            yield f"Checkpoint of step {checkpointer.saved_step} saved to file '{checkpointer.path}'"
+
+    else:
+        raise TMLangSyntaxError(f"line {line_number + 1}: unknown action")
+
+
+def interpret_from_code(
+    code: str | Iterable[str],
+    render_image=True,
+    automatically_open_image_generated=False,
+    budget: RunBudget | None = None,
+    cache: MachineCache | None = None,
+    checkpoint_interval: float | None = None,
+    profile=False,
+    concurrent=False,
+    processes: int | None = None,
+) -> Generator[str]:
+    """Interprets TMLang code (a string, a file object or any iterator of lines), yielding the output of each command
+    The code is read lazily, in a single pass, so a file object is only read as the commands are executed
+    budget is the default budget of the computations, which can be overridden by the options of each run command
+    If a cache is given, the machine defined is loaded from it when the code is unchanged, skipping its parsing
+    and validation, and stored in it otherwise
+    checkpoint_interval is the minimum number of seconds between two checkpoints of a run (by default, one minute)
+    If profile is set to True, every #run command is profiled, like #profile
+    If concurrent is set to True, the commands are read at once and executed concurrently, the computations being
+    run by a pool of processes (by default, one per CPU), and their output is yielded in the same order
+    (see concurrent_commands.execute_concurrently)"""
+    if isinstance(code, str):
+        code = StringIO(code)
+    cache_key = cache.source_key(code) if cache is not None else None
+    cached = cache.load(cache_key) if cache_key is not None else None
+
+    if cached is not None:
+        turing_machine_described, line_number = cached
+        code_lines = read_lines(code, start=line_number + 1)
+    else:
+        code_lines = read_lines(code)
+        turing_machine_described, line_number = define_machine(code_lines)
+        if cache_key is not None:
+            cache.store(cache_key, turing_machine_described, line_number)
+
+    context = ExecutionContext(
+        turing_machine_described,
+        render_image=render_image,
+        automatically_open_image_generated=automatically_open_image_generated,
+        budget=budget,
+        cache=cache,
+        checkpoint_interval=checkpoint_interval,
+        profile=profile,
     )
 
     # We then execute eventual commands
-    is_first_action = True  # used for printing the separator correctly
-    for line_number in range(line_number + 1, len(code_lines)):
-        code_line = remove_comments_and_blanks(code_lines[line_number])
+    if concurrent:
+        from concurrent_commands import execute_concurrently  # imported lazily, as it imports this module
 
+        commands = [(line_number, code_line) for line_number, code_line in code_lines if not is_blank(code_line)]
+        yield from execute_concurrently(context, commands, processes)
+        return
+
+    is_first_action = True  # used for printing the separator correctly
+    for line_number, code_line in code_lines:
         if not is_blank(code_line):
 
             if not is_first_action:
                 yield get_separator()
 
-            if code_line == GET_FORMAL_DEFINITION_COMMAND:
-                yield turing_machine_described.get_formal_definition()
-
-            elif code_line.startswith(RENDER_GRAPHICAL_TRANSITION_DIAGRAM_COMMAND):
-                transition_diagram_graph = turing_machine_described.get_transition_diagram()
-                argument = code_line[len(RENDER_GRAPHICAL_TRANSITION_DIAGRAM_COMMAND) :].strip()
-                if argument:
-                    image_format = argument
-                else:
-                    image_format = DEFAULT_STATE_DIAGRAM_FORMAT
-                if render_image:  # we don't render images in verifying mode
-                    file_name = transition_diagram_graph.render(format=image_format)
-                    yield f"Transition diagram rendered as {image_format} to file '{file_name}'"
-                if automatically_open_image_generated:
-                    startfile(file_name)
-
-            elif code_line.startswith(RUN_WITH_ALL_STEPS_COMMAND):
-                argument = code_line[len(RUN_WITH_ALL_STEPS_COMMAND) :].strip()
-                starting_tape = evaluate_str(argument)
-                for step in turing_machine_described.perform_computation_from_tape(
-                    starting_tape=starting_tape, all_steps=True
-                ):
-                    yield step
-
-            elif code_line.startswith(RUN_FINAL_STATE_ONLY_COMMAND):
-                argument = code_line[len(RUN_FINAL_STATE_ONLY_COMMAND) :].strip()
-                starting_tape = evaluate_str(argument)
-                for step in turing_machine_described.perform_computation_from_tape(
-                    starting_tape=starting_tape, all_steps=False
-                ):
-                    yield step
-
-            else:
-                raise TMLangSyntaxError(f"line {line_number + 1}: unknown action")
+            yield from execute_command(context, line_number, code_line)
 
             is_first_action = False
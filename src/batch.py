@@ -0,0 +1,50 @@
+from turing_machine import TuringMachine, TuringMachineError, RunBudget, LOOP_DETECTION_STEPS
+from typing import Generator, Iterable
+
+BATCH_CHUNK_SIZE = 16  # number of inputs sent to a worker at once
+
+# The machine and the options of the batch, sent once to each worker process instead of with every input
+worker_machine = None
+worker_options = None
+
+
+def initialise_worker(turing_machine: TuringMachine, options: dict):
+    global worker_machine, worker_options
+    worker_machine = turing_machine
+    worker_options = options
+
+
+def run_computation(turing_machine: TuringMachine, starting_tape: str, options: dict) -> str:
+    """Returns the result of the computation of turing_machine from starting_tape
+    Each computation has its own configuration, so the machine is never changed"""
+    try:
+        configuration = turing_machine.new_configuration(starting_tape)
+        *_, result = turing_machine.compute(configuration, starting_tape, all_steps=False, **options)
+        return result
+    except TuringMachineError as error:  # an invalid input doesn't stop the rest of the batch
+        return f"TuringMachineError: {error}"
+
+
+def run_input(starting_tape: str) -> str:
+    """Returns the result of the computation of the worker's machine from starting_tape"""
+    return run_computation(worker_machine, starting_tape, worker_options)
+
+
+def run_batch(
+    turing_machine: TuringMachine,
+    starting_tapes: Iterable[str],
+    budget: RunBudget | None = None,
+    engine=None,
+    loop_detection_steps: int = LOOP_DETECTION_STEPS,
+    processes: int | None = None,
+    chunksize: int = BATCH_CHUNK_SIZE,
+) -> Generator[str]:
+    """Returns a generator that yields the result of the computation from each starting tape, in the same order
+    The computations are run in parallel by a pool of processes (by default, one per CPU),
+    and each result is yielded as soon as the ones before it are available"""
+    from multiprocessing import Pool  # imported lazily, as most programs don't run batches
+
+    options = {"budget": budget, "engine": engine, "loop_detection_steps": loop_detection_steps}
+    with Pool(processes=processes, initializer=initialise_worker, initargs=(turing_machine, options)) as pool:
+        for result in pool.imap(run_input, starting_tapes, chunksize=chunksize):
+            yield result
@@ -0,0 +1,392 @@
+from turing_machine import SimplifiedTuringMachine, Configuration, Tape, LoopDetector, TuringMachineError
+from typing import Generator
+import argparse
+import heapq
+import json
+import os
+
+STATE_NAMES = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+HALT_STATE = "halt"
+# The transitions not defined yet lead to these final states, so that the search knows which one was reached
+UNDEFINED_STATE_PREFIX = "undefined "
+DIRECTIONS = ("L", "R")
+
+DEFAULT_SEARCH_MAX_STEPS = 1000  # the step budget of each machine, beyond which it is watched for cycles
+SHARD_DEPTH = 4  # number of transitions defined by the main process, the subtrees below being searched by the workers
+BEST_MACHINES = 5  # number of machines with the most steps kept
+PROGRESS_FILE_VERSION = 1
+
+# The search run by each worker process, sent once instead of with every shard
+worker_search = None
+
+
+class SearchResult:
+    """
+    The statistics of the search of a part of the tree of machines:
+
+    machines: the number of machines run
+    halting: the number of halting machines found, one for each undefined transition reached
+    looping: the number of machines proven by the loop detector to never halt
+    holdouts: the number of machines that neither halted nor were proven to never halt
+    best: the (steps, non-blank symbols left, transitions) of the halting machines with the most steps
+    """
+
+    def __init__(self):
+        self.machines = 0
+        self.halting = 0
+        self.looping = 0
+        self.holdouts = 0
+        self.best = []
+
+    def add_halting(self, steps: int, non_blank_symbols: int, transitions: dict):
+        self.halting += 1
+        if len(self.best) < BEST_MACHINES or (steps, non_blank_symbols) > self.best[0][:2]:
+            entry = (steps, non_blank_symbols, sorted((key, value) for key, value in transitions.items()))
+            if len(self.best) < BEST_MACHINES:
+                heapq.heappush(self.best, entry)
+            else:
+                heapq.heapreplace(self.best, entry)
+
+    def merge(self, other: "SearchResult"):
+        self.machines += other.machines
+        self.halting += other.halting
+        self.looping += other.looping
+        self.holdouts += other.holdouts
+        self.best = heapq.nlargest(BEST_MACHINES, self.best + other.best)
+        heapq.heapify(self.best)
+
+    def best_machines(self) -> list[tuple[int, int, dict]]:
+        """Returns the best machines found, the one with the most steps first"""
+        return [(steps, symbols, dict(transitions)) for steps, symbols, transitions in sorted(self.best, reverse=True)]
+
+    def as_dict(self) -> dict:
+        return {
+            "machines": self.machines,
+            "halting": self.halting,
+            "looping": self.looping,
+            "holdouts": self.holdouts,
+            "best": [
+                [steps, symbols, [list(key) + list(value) for key, value in transitions]]
+                for steps, symbols, transitions in self.best
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchResult":
+        result = cls()
+        result.machines = data["machines"]
+        result.halting = data["halting"]
+        result.looping = data["looping"]
+        result.holdouts = data["holdouts"]
+        result.best = [
+            (steps, symbols, [(tuple(transition[:2]), tuple(transition[2:])) for transition in transitions])
+            for steps, symbols, transitions in data["best"]
+        ]
+        heapq.heapify(result.best)
+        return result
+
+
+class BusyBeaverSearch:
+    """
+    Searches the machines with number_of_states states and number_of_symbols symbols for the ones halting
+    after the most steps from a blank tape, by enumerating them in tree normal form:
+
+    Each machine starts with no transition defined, and is run until it reaches an undefined transition,
+    which is then defined in every possible way (one of them being to halt), each one giving a new machine
+    that goes on from there. The states and symbols are only introduced in order, and the first move is to the right,
+    so that machines that only differ by the names of their states and symbols or by symmetry are enumerated once
+
+    A machine that doesn't reach an undefined transition within max_steps steps is pruned, after it is watched
+    by the loop detector for loop_detection_steps steps (proving it never halts) or counted as a holdout
+    """
+
+    def __init__(
+        self,
+        number_of_states: int,
+        number_of_symbols: int = 2,
+        max_steps: int = DEFAULT_SEARCH_MAX_STEPS,
+        loop_detection_steps: int | None = None,
+    ):
+        if not 1 <= number_of_states <= len(STATE_NAMES):
+            raise TuringMachineError(
+                f"Invalid number of states {number_of_states}: it must be from 1 to {len(STATE_NAMES)}"
+            )
+        if not 2 <= number_of_symbols <= 10:
+            raise TuringMachineError(f"Invalid number of symbols {number_of_symbols}: it must be from 2 to 10")
+
+        self.number_of_states = number_of_states
+        self.number_of_symbols = number_of_symbols
+        self.max_steps = max_steps
+        self.loop_detection_steps = max_steps if loop_detection_steps is None else loop_detection_steps
+        self.states = list(STATE_NAMES[:number_of_states])
+        self.symbols = [str(symbol) for symbol in range(number_of_symbols)]
+
+    def parameters(self) -> dict:
+        return {
+            "version": PROGRESS_FILE_VERSION,
+            "states": self.number_of_states,
+            "symbols": self.number_of_symbols,
+            "max_steps": self.max_steps,
+            "loop_detection_steps": self.loop_detection_steps,
+            "shard_depth": SHARD_DEPTH,
+        }
+
+    def build_machine(self, transitions: dict) -> SimplifiedTuringMachine:
+        """Returns the machine with the given transitions, whose undefined transitions lead to final states"""
+        used_states = {self.states[0]} | {key[0] for key in transitions} | {value[0] for value in transitions.values()}
+        used_symbols = {self.symbols[0]} | {value[1] for value in transitions.values()}
+        transition_function = dict(transitions)
+        final_states = set()
+        for state in used_states:
+            for symbol in used_symbols:
+                if (state, symbol) not in transitions:
+                    transition_function[(state, symbol)] = (UNDEFINED_STATE_PREFIX + state, symbol, "N")
+                    final_states.add(UNDEFINED_STATE_PREFIX + state)
+        return SimplifiedTuringMachine(
+            name="candidate",
+            transition_function=transition_function,
+            initial_state=self.states[0],
+            final_states=tuple(sorted(final_states)),
+            blank_symbol=self.symbols[0],
+        )
+
+    def children(self, transitions: dict, key: tuple, configuration: Configuration) -> list[tuple]:
+        """Returns the machines defining the transition key in every possible way except halting,
+        each one going on from the configuration"""
+        used_states = 1 + max([self.states.index(value[0]) for value in transitions.values()], default=0)
+        used_symbols = 1 + max([self.symbols.index(value[1]) for value in transitions.values()], default=0)
+        directions = DIRECTIONS if transitions else DIRECTIONS[1:]  # the first move is to the right, by symmetry
+
+        children = []
+        for new_state in self.states[: min(used_states + 1, self.number_of_states)]:
+            for new_symbol in self.symbols[: min(used_symbols + 1, self.number_of_symbols)]:
+                for direction in directions:
+                    c = configuration
+                    children.append(
+                        (
+                            transitions | {key: (new_state, new_symbol, direction)},
+                            Configuration(c.state, c.tape.copy(), c.head_position, c.num_step),
+                        )
+                    )
+        return children
+
+    def root(self) -> tuple[dict, Configuration]:
+        """Returns the machine with no transition, which reaches the undefined transition (initial state, blank)"""
+        return {}, Configuration(self.states[0], Tape("", blank_symbol=self.symbols[0], symbols=self.symbols))
+
+    def expand(self, transitions: dict, configuration: Configuration, result: SearchResult) -> list[tuple]:
+        """Runs the machine from the configuration until it reaches an undefined transition, updating result,
+        and returns the machines that define it"""
+        c = configuration
+        if transitions:
+            machine = self.build_machine(transitions)
+            start = (c.state, c.tape.copy(), c.head_position, c.num_step)
+            c.state, c.head_position, c.num_step = machine.compiled.run(
+                c.state, c.tape, c.head_position, c.num_step, self.max_steps
+            )
+            result.machines += 1
+
+            if c.state not in machine.final_states:  # the machine is pruned
+                state, tape, head_position, num_step = start
+                *_, loop = LoopDetector(machine.compiled, state, tape, head_position, num_step).run(
+                    state, tape, head_position, num_step, max(self.loop_detection_steps, num_step + 1)
+                )
+                if loop is not None:
+                    result.looping += 1
+                else:
+                    result.holdouts += 1
+                return []
+
+            # The step leading to the final state didn't change the tape
+            c.state = c.state[len(UNDEFINED_STATE_PREFIX) :]
+            c.num_step -= 1
+
+        key = (c.state, c.tape[c.head_position])
+        tape = c.tape
+        non_blank_symbols = tape.used_cells() - tape.cells[tape.lowest : tape.highest + 1].count(0)
+        # The machine halting there, writing the first non-blank symbol, runs for num_step steps
+        result.add_halting(
+            c.num_step,
+            non_blank_symbols + (key[1] == self.symbols[0]),
+            transitions | {key: (HALT_STATE, self.symbols[1], DIRECTIONS[1])},
+        )
+        if len(transitions) + 1 >= self.number_of_states * self.number_of_symbols:  # the last one must halt
+            return []
+        return self.children(transitions, key, c)
+
+    def search_subtree(self, transitions: dict, configuration: Configuration) -> SearchResult:
+        """Returns the result of the search of the machine and of all the ones derived from it"""
+        result = SearchResult()
+        stack = [(transitions, configuration)]
+        while stack:
+            stack.extend(self.expand(*stack.pop(), result))
+        return result
+
+    def shards(self) -> tuple[list[tuple], SearchResult]:
+        """Returns the machines with SHARD_DEPTH transitions defined, whose subtrees are searched independently,
+        and the result of the search of the machines with fewer transitions"""
+        result = SearchResult()
+        shards = []
+        level = [self.root()]
+        while level:
+            next_level = []
+            for transitions, configuration in level:
+                if len(transitions) >= SHARD_DEPTH:
+                    shards.append((transitions, configuration))
+                else:
+                    next_level.extend(self.expand(transitions, configuration, result))
+            level = next_level
+        return shards, result
+
+    def search(self, processes: int | None = None, progress_path: str | None = None) -> Generator[str]:
+        """Returns a generator that yields a line of progress for each percent of the shards searched,
+        and that returns the SearchResult of the whole search, run by a pool of processes (by default, one per CPU)
+        If progress_path is given, the result of each shard is appended to this file as soon as it is searched,
+        and the shards already in it are skipped, so that an interrupted search can be resumed"""
+        from multiprocessing import Pool  # imported lazily, like in batch
+
+        shards, result = self.shards()
+        done = self.load_progress(progress_path) if progress_path is not None else {}
+        for shard_result in done.values():
+            result.merge(shard_result)
+        pending = [index for index in range(len(shards)) if index not in done]
+        yield f"{len(shards)} shards, {len(done)} already searched"
+
+        progress_file = self.open_progress(progress_path, bool(done)) if progress_path is not None else None
+        try:
+            with Pool(processes=processes, initializer=initialise_worker, initargs=(self,)) as pool:
+                for count, (index, shard_result) in enumerate(
+                    pool.imap_unordered(search_shard, [(index, shards[index]) for index in pending]), 1
+                ):
+                    result.merge(shard_result)
+                    if progress_file is not None:
+                        progress_file.write(json.dumps({"shard": index, "result": shard_result.as_dict()}) + "\n")
+                        progress_file.flush()
+                    percentage = 100 * (len(done) + count) // len(shards)
+                    if percentage > 100 * (len(done) + count - 1) // len(shards):
+                        yield f"{percentage}% of the shards searched: {result.machines} machines run"
+        finally:
+            if progress_file is not None:
+                progress_file.close()
+        return result
+
+    def load_progress(self, progress_path: str) -> dict:
+        """Returns the results of the shards listed in the progress file, indexed by shard"""
+        try:
+            with open(progress_path, "r", encoding="utf-8") as file:
+                lines = file.read().split("\n")
+        except FileNotFoundError:
+            return {}
+        try:
+            parameters = json.loads(lines[0])
+        except json.JSONDecodeError:
+            raise TuringMachineError(f"'{progress_path}' isn't a progress file")
+        if parameters != self.parameters():
+            raise TuringMachineError(
+                f"The progress file '{progress_path}' was written by a search with other parameters"
+            )
+
+        done = {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:  # the last line may be partially written, if the search was interrupted
+                continue
+            done[entry["shard"]] = SearchResult.from_dict(entry["result"])
+        return done
+
+    def open_progress(self, progress_path: str, resumed: bool):
+        if resumed:
+            file = open(progress_path, "a", encoding="utf-8")
+            file.write("\n")  # in case the last line was partially written
+            return file
+        file = open(progress_path, "w", encoding="utf-8")
+        file.write(json.dumps(self.parameters()) + "\n")
+        return file
+
+    def machine_code(self, rank: int, steps: int, non_blank_symbols: int, transitions: dict) -> str:
+        """Returns the TMLang code of a machine found"""
+        lines = [
+            f"// Found by busy_beaver.py among the {self.number_of_states}-state {self.number_of_symbols}-symbol machines",
+            f"// Halts after {steps} steps from a blank tape, leaving {non_blank_symbols} non-blank symbols",
+            "",
+            "",
+            f"name '{self.number_of_states}-state {self.number_of_symbols}-symbol machine #{rank}'",
+            f"blank {self.symbols[0]}",
+            f"initial {self.states[0]}",
+            f"final {{{HALT_STATE}}}",
+            "",
+            "startprogr",
+        ]
+        for (state, symbol), (new_state, new_symbol, direction) in sorted(transitions.items()):
+            lines.append(f"    {state}, {symbol}: {new_state}, {new_symbol}, {direction}")
+        lines += ["endprogr", "", "", "#run '' steps=0", ""]
+        return "\n".join(lines)
+
+
+def initialise_worker(search: BusyBeaverSearch):
+    global worker_search
+    worker_search = search
+
+
+def search_shard(shard: tuple) -> tuple[int, SearchResult]:
+    index, (transitions, configuration) = shard
+    return index, worker_search.search_subtree(transitions, configuration)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Searches the Turing machines with a given number of states and symbols for the ones halting after the most steps from a blank tape",
+    )
+    parser.add_argument("states", type=int, help="the number of states of the machines, besides the halting state")
+    parser.add_argument("--symbols", type=int, default=2, help="the number of symbols of the machines (default: 2)")
+    parser.add_argument(
+        "--max-steps",
+        type=int,
+        default=DEFAULT_SEARCH_MAX_STEPS,
+        help=f"the number of steps after which a machine is watched for cycles, or counted as a holdout (default: {DEFAULT_SEARCH_MAX_STEPS})",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=None, help="the number of worker processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--progress",
+        default=None,
+        help="the file to which the progress of the search is saved, and from which it is resumed if it exists",
+    )
+    parser.add_argument(
+        "--output-directory", default=".", help="the directory in which the best machines are written (default: .)"
+    )
+    args = parser.parse_args()
+
+    try:
+        search = BusyBeaverSearch(args.states, args.symbols, max_steps=args.max_steps)
+        progress = search.search(processes=args.processes, progress_path=args.progress)
+        while True:
+            try:
+                print(next(progress))
+            except StopIteration as stop:
+                result = stop.value
+                break
+    except TuringMachineError as error:
+        print(f"TuringMachineError: {error}")
+        return
+
+    print(
+        f"\n{result.machines} machines run: {result.halting} halting machines found, {result.looping} proven to never halt,"
+        f" {result.holdouts} holdouts (neither halting nor proven to never halt within {args.max_steps} steps)"
+    )
+    os.makedirs(args.output_directory, exist_ok=True)
+    for rank, (steps, non_blank_symbols, transitions) in enumerate(result.best_machines(), 1):
+        file_name = os.path.join(
+            args.output_directory, f"busy_beaver_{args.states}_states_{args.symbols}_symbols_{rank}.tmlang"
+        )
+        with open(file_name, "w", encoding="utf-8") as file:
+            file.write(search.machine_code(rank, steps, non_blank_symbols, transitions))
+        print(
+            f"#{rank}: halts after {steps} steps, leaving {non_blank_symbols} non-blank symbols, written to '{file_name}'"
+        )
+
+
+if __name__ == "__main__":
+    main()
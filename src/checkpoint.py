@@ -0,0 +1,135 @@
+from turing_machine import (
+    TuringMachine,
+    CompiledTuringMachine,
+    Configuration,
+    Tape,
+    TuringMachineError,
+    DEFAULT_CHECKPOINT_INTERVAL,
+)
+from machine_cache import remove_file
+from array import array
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+
+# A checkpoint file is made of CHECKPOINT_MAGIC, the CRC-32 of the rest of the file, a header, the JSON of the
+# metadata (machine fingerprint, starting tape, state and tape symbols), and the symbol ids of the cells written,
+# compressed with zlib
+CHECKPOINT_MAGIC = b"TMCKPT02"
+CHECKPOINT_CHECKSUM = struct.Struct("<I")
+# num_step, head position, position of the first cell, number of cells, length of the metadata
+CHECKPOINT_HEADER = struct.Struct("<QqqQI")
+COMPRESSION_LEVEL = 1  # the fastest, as tapes of a few symbols compress well anyway
+
+
+def machine_fingerprint(compiled: CompiledTuringMachine) -> str:
+    """Returns a hash of the machine, so that a checkpoint is never resumed by an other machine"""
+    definition = [compiled.states, compiled.symbols, compiled.table, sorted(compiled.final_state_ids)]
+    return hashlib.sha256(json.dumps(definition).encode()).hexdigest()
+
+
+class Checkpointer:
+    """
+    Saves the configuration of a computation to a checkpoint file, so that it can be resumed if it is interrupted:
+
+    path: the checkpoint file, which is replaced atomically by each new checkpoint
+    interval: the minimum number of seconds between two checkpoints
+    resumed_step: the step from which the computation was resumed, if it was
+    saved_step: the step of the last checkpoint saved, if any
+    """
+
+    def __init__(self, path: str, turing_machine: TuringMachine, interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.fingerprint = machine_fingerprint(turing_machine.compiled)
+        self.last_save_time = time.perf_counter()
+        self.resumed_step = None
+        self.saved_step = None
+
+    def save_if_due(self, configuration: Configuration, starting_tape: str):
+        """Saves the configuration if the last checkpoint is at least interval seconds old"""
+        if time.perf_counter() - self.last_save_time >= self.interval:
+            self.save(configuration, starting_tape)
+
+    def save(self, configuration: Configuration, starting_tape: str):
+        c = configuration
+        tape = c.tape
+        metadata = json.dumps(
+            {"machine": self.fingerprint, "starting_tape": starting_tape, "state": c.state, "symbols": tape.symbols}
+        ).encode()
+        if tape.is_empty():
+            first_cell, cells = 0, tape.blank_cells(0)
+        else:
+            first_cell, cells = tape.lowest - tape.origin, tape.cells[tape.lowest : tape.highest + 1]
+        header = CHECKPOINT_HEADER.pack(c.num_step, c.head_position, first_cell, len(cells), len(metadata))
+
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_path, "wb") as file:
+                body = header + metadata + zlib.compress(cells, COMPRESSION_LEVEL)
+                file.write(CHECKPOINT_MAGIC + CHECKPOINT_CHECKSUM.pack(zlib.crc32(body)))
+                file.write(body)
+                file.flush()
+                os.fsync(file.fileno())  # so that the checkpoint replaced is never lost before the new one is written
+            os.replace(temporary_path, self.path)  # the checkpoint file is never partially written
+        except OSError as error:
+            remove_file(temporary_path)
+            raise TuringMachineError(f"Cannot write the checkpoint file '{self.path}' ({error.strerror})")
+
+        self.last_save_time = time.perf_counter()
+        self.saved_step = c.num_step
+
+    def load(self, turing_machine: TuringMachine, starting_tape: str) -> Configuration | None:
+        """Returns the configuration saved by the last checkpoint of the computation from starting_tape,
+        or None if there is no checkpoint file yet"""
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as error:
+            raise TuringMachineError(f"Cannot read the checkpoint file '{self.path}' ({error.strerror})")
+
+        header_start = len(CHECKPOINT_MAGIC) + CHECKPOINT_CHECKSUM.size
+        metadata_start = header_start + CHECKPOINT_HEADER.size
+        if data[: len(CHECKPOINT_MAGIC)] != CHECKPOINT_MAGIC or len(data) < metadata_start:
+            raise TuringMachineError(f"'{self.path}' isn't a checkpoint file")
+        # a corrupted header could make the tape grow to any size, so the whole file is checked first
+        (checksum,) = CHECKPOINT_CHECKSUM.unpack_from(data, len(CHECKPOINT_MAGIC))
+        if zlib.crc32(data[header_start:]) != checksum:
+            raise TuringMachineError(f"'{self.path}' is a corrupted checkpoint file")
+        num_step, head_position, first_cell, number_of_cells, metadata_length = CHECKPOINT_HEADER.unpack_from(
+            data, header_start
+        )
+        # a file passing the check can still be inconsistent (ValueError includes JSONDecodeError)
+        try:
+            metadata = json.loads(data[metadata_start : metadata_start + metadata_length])
+            if metadata["machine"] != self.fingerprint:
+                raise TuringMachineError(f"The checkpoint file '{self.path}' was saved by an other Turing machine")
+            if metadata["starting_tape"] != starting_tape:
+                raise TuringMachineError(
+                    f"The checkpoint file '{self.path}' was saved by the computation from input "
+                    f"'{metadata['starting_tape']}'"
+                )
+
+            state = metadata["state"]
+            tape = Tape("", blank_symbol=turing_machine.blank_symbol, symbols=metadata["symbols"])
+            if number_of_cells:
+                cells = zlib.decompress(data[metadata_start + metadata_length :])
+                if len(tape.symbols) > 256:
+                    cells = array("H", cells)
+                if len(cells) != number_of_cells:  # assigning them to the tape's cells would resize it instead
+                    raise TuringMachineError(f"'{self.path}' is a corrupted checkpoint file")
+                tape.reserve(first_cell)
+                tape.reserve(first_cell + number_of_cells - 1)
+                tape.lowest = first_cell + tape.origin
+                tape.highest = tape.lowest + number_of_cells - 1
+                tape.cells[tape.lowest : tape.highest + 1] = cells
+        except (ValueError, KeyError, TypeError, IndexError, zlib.error):
+            raise TuringMachineError(f"'{self.path}' is a corrupted checkpoint file")
+
+        self.resumed_step = num_step
+        return Configuration(state, tape, head_position, num_step)
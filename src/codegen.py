@@ -0,0 +1,288 @@
+from turing_machine import CompiledTuringMachine, Tape, BUDGET_CHECK_INTERVAL
+from functools import lru_cache
+
+GENERATED_FUNCTION_NAME = "generated_run"
+DISPATCH_CHAIN_LENGTH = 4  # up to this number of cases, a dispatch is a chain of comparisons instead of a binary search
+GENERATED_FUNCTIONS_CACHED = 64  # number of generated functions kept compiled, the least recently used being dropped
+MINIMUM_SWEEP = 8  # number of cells holding the symbol ahead of the head from which a sweep is faster than steps
+LEFT_SWEEP_CHUNK = 64  # number of cells searched at first by a sweep to the left, doubled at each search
+INDENTATION = "    "
+
+
+def find_left(cells: bytearray, symbol: bytes, position: int, start: int) -> int | None:
+    """Returns the index of the last cell from start to position which doesn't hold the symbol, or None
+    The cells are searched by chunks growing to the left, so that a short sweep never copies the whole tape"""
+    end = position + 1
+    start = max(start, 0)
+    chunk = LEFT_SWEEP_CHUNK
+    while end > start:
+        begin = max(start, end - chunk)
+        remaining = len(cells[begin:end].rstrip(symbol))
+        if remaining:
+            return begin + remaining - 1
+        end = begin
+        chunk *= 2
+    return None
+
+
+class SourceWriter:
+    """The lines of a generated source, with the indentation of the block they are written in"""
+
+    def __init__(self):
+        self.lines = []
+        self.depth = 0
+
+    def write(self, *lines: str):
+        self.lines.extend(INDENTATION * self.depth + line for line in lines)
+
+    def indent(self):
+        self.depth += 1
+
+    def dedent(self):
+        self.depth -= 1
+
+    def dispatch(self, variable: str, ids: range, write_case):
+        """Writes the code choosing the case of the value of variable among ids, by binary search then by a chain
+        of comparisons, the code of each case being written by write_case(id)"""
+        if len(ids) > DISPATCH_CHAIN_LENGTH:
+            middle = ids[len(ids) // 2]
+            self.write(f"if {variable} < {middle}:")
+            self.indent()
+            self.dispatch(variable, range(ids.start, middle), write_case)
+            self.dedent()
+            self.write("else:")
+            self.indent()
+            self.dispatch(variable, range(middle, ids.stop), write_case)
+            self.dedent()
+            return
+
+        for i, value in enumerate(ids):
+            if len(ids) == 1:
+                write_case(value)
+                return
+            if i == 0:
+                self.write(f"if {variable} == {value}:")
+            elif i < len(ids) - 1:
+                self.write(f"elif {variable} == {value}:")
+            else:  # the value can't be anything else
+                self.write("else:")
+            self.indent()
+            write_case(value)
+            self.dedent()
+
+    def source(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def generate_source(compiled: CompiledTuringMachine) -> str:
+    """Returns the source of a function running the machine like CompiledTuringMachine.run, on the ids of its states
+    and on the indexes of the tape's cells:
+    generated_run(tape, position, state, num_step, max_steps) -> (state, position, num_step)
+    It stops before the step at which the machine reaches a final state or an undefined transition"""
+    number_of_symbols = compiled.number_of_symbols
+    # sweeps search the cells as bytes, which they are as long as symbol ids fit in a byte
+    sweeps = number_of_symbols <= 256
+    source = SourceWriter()
+
+    source.write("import re", "")
+    if sweeps:
+        for symbol_id in range(number_of_symbols):
+            source.write(
+                f"OTHER_THAN_{symbol_id} = re.compile(rb'[^\\x{symbol_id:02x}]')",
+                f"RUN_OF_{symbol_id} = b'\\x{symbol_id:02x}' * {MINIMUM_SWEEP}",
+            )
+    source.write(
+        "",
+        "",
+        f"def {GENERATED_FUNCTION_NAME}(tape, position, state, num_step, max_steps):",
+    )
+    source.indent()
+    # the bounds of the cells written are kept like in CompiledTuringMachine.run, the cell the head moves to being
+    # counted at once, and uncounted if no step is run from it (extended_at being then the current step)
+    source.write(
+        "cells = tape.cells",
+        "size = len(cells)",
+        "lowest = tape.lowest",
+        "highest = tape.highest",
+        "extended_at = None",
+        "if lowest > highest:",
+        "    lowest = highest = position",
+        "    extended_at = num_step",
+        "elif position < lowest:",
+        "    lowest = position",
+        "    extended_at = num_step",
+        "elif position > highest:",
+        "    highest = position",
+        "    extended_at = num_step",
+        "try:",
+    )
+    source.indent()
+    # the steps are counted by a for loop, which is left to count them again from the step reached by a sweep
+    source.write(
+        "resume = True",
+        "while resume:",
+        "    resume = False",
+        "    for num_step in range(num_step, max_steps):",
+    )
+    source.indent()
+    source.indent()
+    source.write("symbol = cells[position]")
+
+    def write_right_bound(extended_at: str = "num_step + 1"):
+        source.write(
+            "if position > highest:",
+            "    while position >= size:",
+            "        tape.grow_right()",
+            "        size = len(cells)",
+            "    highest = position",
+            f"    extended_at = {extended_at}",
+        )
+
+    def write_left_bound(extended_at: str = "num_step + 1"):
+        source.write(
+            "if position < lowest:",
+            "    while position < 0:",
+            "        shift = tape.grow_left()",
+            "        position += shift",
+            "        highest += shift",
+            "        size = len(cells)",
+            "    lowest = position",
+            f"    extended_at = {extended_at}",
+        )
+
+    def write_transition(state_id: int, symbol_id: int):
+        entry = compiled.table[compiled.row(state_id) + symbol_id]
+        if entry is None:  # the machine halts, or no transition is defined
+            source.write("break")
+            return
+        row, new_symbol_id, delta = entry
+        new_state_id = row // number_of_symbols
+        if new_state_id == state_id and new_symbol_id == symbol_id:
+            if delta == 0:  # the configuration never changes again
+                source.write("num_step = max_steps", "resume = True", "break")
+                return
+            # the head sweeps across the cells holding the symbol, if there are enough of them ahead to be worth it
+            if sweeps and delta > 0:
+                end = (
+                    "position + max_steps - num_step"
+                    if symbol_id == 0
+                    else "min(position + max_steps - num_step, size)"
+                )
+                source.write(f"if cells[position : position + {MINIMUM_SWEEP}] == RUN_OF_{symbol_id}:")
+                source.indent()
+                source.write(
+                    f"stop = OTHER_THAN_{symbol_id}.search(cells, position, position + max_steps - num_step)",
+                    f"stop = {end} if stop is None else stop.start()",
+                    "num_step += stop - position",
+                    "position = stop",
+                )
+                write_right_bound(extended_at="num_step")
+                source.write("resume = True", "break")
+                source.dedent()
+            if sweeps and delta < 0:
+                end = "position - max_steps + num_step"
+                source.write(
+                    f"if position >= {MINIMUM_SWEEP - 1} and "
+                    f"cells[position - {MINIMUM_SWEEP - 1} : position + 1] == RUN_OF_{symbol_id}:"
+                )
+                source.indent()
+                source.write(
+                    f"stop = find_left(cells, b'\\x{symbol_id:02x}', position, {end})",
+                    "if stop is None:",
+                    f"    stop = {end if symbol_id == 0 else f'max({end}, -1)'}",
+                    "num_step += position - stop",
+                    "position = stop",
+                )
+                write_left_bound(extended_at="num_step")
+                source.write("resume = True", "break")
+                source.dedent()
+
+        if new_symbol_id != symbol_id:
+            source.write(f"cells[position] = {new_symbol_id}")
+        if delta > 0:
+            source.write(f"position += {delta}")
+            write_right_bound()
+        elif delta < 0:
+            source.write(f"position -= {-delta}")
+            write_left_bound()
+        if new_state_id != state_id:
+            source.write(f"state = {new_state_id}")
+
+    def write_state(state_id: int):
+        source.write(f"# state {compiled.states[state_id]!r}")
+        if state_id in compiled.final_state_ids:
+            source.write("break")
+            return
+        source.dispatch("symbol", range(number_of_symbols), lambda symbol_id: write_transition(state_id, symbol_id))
+
+    source.dispatch("state", range(len(compiled.states)), write_state)
+    source.dedent()
+    source.write("else:", "    num_step = max_steps")
+    source.dedent()
+    source.write(
+        "if extended_at == num_step:  # the cell under the head wasn't actually written",
+        "    if position == lowest:",
+        "        lowest += 1",
+        "    else:",
+        "        highest -= 1",
+    )
+    source.dedent()
+    source.write(
+        "finally:  # the tape bounds are updated even if the computation fails",
+        "    tape.lowest = lowest",
+        "    tape.highest = highest",
+        "return state, position, num_step",
+    )
+    return source.source()
+
+
+@lru_cache(maxsize=GENERATED_FUNCTIONS_CACHED)
+def load_function(source: str):
+    """Returns the function defined by a generated source, which is only compiled the first time"""
+    namespace = {"find_left": find_left}
+    exec(compile(source, f"<{GENERATED_FUNCTION_NAME}>", "exec"), namespace)
+    return namespace[GENERATED_FUNCTION_NAME]
+
+
+class GeneratedMachine:
+    """
+    Execution engine running a compiled Turing machine as specialized Python source, generated then exec'd once:
+    each state is a block of code dispatching on the symbol scanned with comparisons, in which the symbol written,
+    the head move and the next state are constants, and the tape is only extended on the side the head moves to
+    A transition staying in its state without changing the symbol sweeps across the whole run of cells holding it
+    at once (if it's at least MINIMUM_SWEEP cells long), found by a regular expression (or by rstrip, to the left)
+    instead of step by step, which makes it much faster than the compiled engine for machines sweeping across
+    the tape like busy beavers, while machines with many states are slower to dispatch by comparisons
+
+    source: the generated source, which can be printed to see how the machine is run
+
+    The results are the same as with the compiled engine
+    """
+
+    budget_check_interval = BUDGET_CHECK_INTERVAL
+
+    def __init__(self, compiled: CompiledTuringMachine):
+        self.compiled = compiled
+        self.source = generate_source(compiled)
+        self.function = load_function(self.source)
+
+    def __getstate__(self) -> dict:  # the function is compiled again by each process the engine is sent to
+        return {"compiled": self.compiled, "source": self.source}
+
+    def __setstate__(self, state: dict):
+        self.compiled = state["compiled"]
+        self.source = state["source"]
+        self.function = load_function(self.source)
+
+    def run(self, state: str, tape: Tape, head_position: int, num_step: int, max_steps: int) -> tuple[str, int, int]:
+        """Same as CompiledTuringMachine.run"""
+        compiled = self.compiled
+        state_id = compiled.state_ids[state]
+        if state_id in compiled.final_state_ids or num_step >= max_steps:
+            return state, head_position, num_step
+
+        position = tape.reserve(head_position)
+        state_id, position, num_step = self.function(tape, position, state_id, num_step, max_steps)
+        if num_step < max_steps and state_id not in compiled.final_state_ids:
+            raise compiled.undefined_transition(state_id, tape.cells[position])
+        return compiled.states[state_id], position - tape.origin, num_step
@@ -0,0 +1,80 @@
+from TMLang_interpreter import (
+    ExecutionContext,
+    execute_command,
+    get_separator,
+    MINIMIZE_COMMAND,
+    RUN_WITH_ALL_STEPS_COMMAND,
+    RUN_FINAL_STATE_ONLY_COMMAND,
+    RUN_BATCH_COMMAND,
+    PROFILE_COMMAND,
+)
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from copy import copy
+from typing import Generator, Iterable
+
+# The context of the program, sent once to each worker process instead of with every command
+worker_context = None
+
+
+def initialise_worker(context: ExecutionContext):
+    global worker_context
+    worker_context = context
+
+
+def execute_in_worker(line_number: int, code_line: str) -> list[str]:
+    """Returns the output of a command executed with the worker's context, which is its own copy of the machine"""
+    return list(execute_command(worker_context, line_number, code_line))
+
+
+def execute_in_thread(context: ExecutionContext, line_number: int, code_line: str) -> list[str]:
+    return list(execute_command(context, line_number, code_line))
+
+
+def is_computation(code_line: str) -> bool:
+    """Returns True if the command runs a single computation, which is executed by a worker process
+    (#runbatch is executed by a thread, as it runs its computations in its own pool of processes)"""
+    return code_line.startswith(
+        (RUN_WITH_ALL_STEPS_COMMAND, RUN_FINAL_STATE_ONLY_COMMAND, PROFILE_COMMAND)
+    ) and not code_line.startswith(RUN_BATCH_COMMAND)
+
+
+def execute_concurrently(
+    context: ExecutionContext, commands: Iterable[tuple[int, str]], processes: int | None = None
+) -> Generator[str]:
+    """Executes the commands (line_number, code_line) of a program concurrently, yielding their output in the same
+    order, with the same separators, as if they were executed one after another
+    The computations are run by a pool of processes (by default, one per CPU), and the other commands, like
+    #renderdiagram, by threads. The output of each command is yielded once it and the ones before it are over,
+    and an error is raised once the output of the commands before it has been yielded, the commands after it
+    being cancelled if they haven't started yet"""
+    from multiprocessing import get_context  # imported lazily, like in batch
+
+    # the workers are spawned, as forking the process while its threads are running is unsafe
+    process_pool = ProcessPoolExecutor(
+        max_workers=processes, mp_context=get_context("spawn"), initializer=initialise_worker, initargs=(context,)
+    )
+    thread_pool = ThreadPoolExecutor()
+    try:
+        results = []
+        for line_number, code_line in commands:
+            if is_computation(code_line):  # the computations are performed by the machine described, never displayed
+                results.append(process_pool.submit(execute_in_worker, line_number, code_line))
+            elif code_line == MINIMIZE_COMMAND:
+                # it is executed at once, as the commands after it display the machine it returns
+                result = Future()
+                try:
+                    result.set_result(list(execute_command(context, line_number, code_line)))
+                except Exception as error:
+                    result.set_exception(error)
+                results.append(result)
+            else:  # each command displays the machine displayed when it's reached
+                results.append(thread_pool.submit(execute_in_thread, copy(context), line_number, code_line))
+
+        for i, result in enumerate(results):
+            if i:
+                yield get_separator()
+            yield from result.result()
+
+    finally:
+        process_pool.shutdown(cancel_futures=True)
+        thread_pool.shutdown(cancel_futures=True)
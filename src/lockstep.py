@@ -0,0 +1,187 @@
+from turing_machine import TuringMachine, TuringMachineError, RunBudget, LOOP_DETECTION_STEPS
+from batch import run_computation
+from typing import Generator, Iterable
+
+try:  # NumPy is only needed by the lockstep simulator
+    import numpy
+except ImportError:
+    numpy = None
+
+LOCKSTEP_MAX_STEPS = 10000  # number of steps simulated in lockstep, the longer computations being run one by one
+LOCKSTEP_MIN_WIDTH = 64  # initial number of tape cells of each lane
+
+
+class LockstepSimulator:
+    """
+    Runs one Turing machine on many starting tapes at once, each tape being a lane of a 2-D NumPy array:
+
+    tapes[lane, column] is the symbol id of a cell, the cell 0 of every tape being at column origin
+    states and heads are the state id and the head column of each lane
+    lowest and highest are the columns of the leftmost and rightmost cells written on each lane
+
+    Each step is a single vectorized lookup in the flattened transition table for all the running lanes,
+    which are removed as they halt or fail
+    """
+
+    def __init__(self, turing_machine: TuringMachine):
+        if numpy is None:
+            raise TuringMachineError("The lockstep simulator requires NumPy, which isn't installed")
+
+        self.turing_machine = turing_machine
+        compiled = turing_machine.compiled
+        self.compiled = compiled
+        self.dtype = numpy.uint8 if compiled.number_of_symbols <= 256 else numpy.uint16
+
+        # The flattened transition table, split into arrays indexed by state_id * number_of_symbols + symbol_id
+        size = len(compiled.table)
+        self.next_states = numpy.zeros(size, dtype=numpy.intp)
+        self.new_symbols = numpy.zeros(size, dtype=self.dtype)
+        self.deltas = numpy.zeros(size, dtype=numpy.intp)
+        self.defined = numpy.zeros(size, dtype=bool)
+        for index, entry in enumerate(compiled.table):
+            if entry is not None:
+                next_row, new_symbol, delta = entry
+                self.next_states[index] = next_row // compiled.number_of_symbols
+                self.new_symbols[index] = new_symbol
+                self.deltas[index] = delta
+                self.defined[index] = True
+
+        self.final = numpy.zeros(len(compiled.states), dtype=bool)
+        self.final[list(compiled.final_state_ids)] = True
+
+    def simulate(self, starting_tapes: list[str], max_steps: int) -> dict:
+        """Runs the machine from each starting tape (all of them being valid) until num_step reaches max_steps
+        Returns a dict mapping the index of each tape that halted or failed to its result,
+        the other computations being left to perform_computation_from_tape"""
+        compiled = self.compiled
+        number_of_symbols = compiled.number_of_symbols
+        lanes = len(starting_tapes)
+        results = {}
+        if not lanes:
+            return results
+
+        width = max(LOCKSTEP_MIN_WIDTH, 2 * max(map(len, starting_tapes)))
+        origin = width // 2
+        tapes = numpy.zeros((lanes, width), dtype=self.dtype)
+        lowest = numpy.full(lanes, origin, dtype=numpy.intp)
+        highest = numpy.empty(lanes, dtype=numpy.intp)
+        for lane, starting_tape in enumerate(starting_tapes):
+            tapes[lane, origin : origin + len(starting_tape)] = [compiled.symbol_ids[char] for char in starting_tape]
+            highest[lane] = origin + len(starting_tape) - 1
+
+        initial_state = compiled.state_ids[self.turing_machine.initial_state]
+        states = numpy.full(lanes, initial_state, dtype=numpy.intp)
+        heads = numpy.full(lanes, origin, dtype=numpy.intp)
+        running = numpy.arange(lanes)
+        if self.final[initial_state]:
+            running = running[:0]
+
+        num_step = 1
+        while running.size and num_step < max_steps:
+            positions = heads[running]
+            if positions.min() < 0 or positions.max() >= width:  # the tapes grow (amortized) in both directions
+                tapes = numpy.pad(tapes, ((0, 0), (width, width)))
+                origin += width
+                heads += width
+                lowest += width
+                highest += width
+                positions += width
+                width *= 3
+
+            symbols = tapes[running, positions]
+            indexes = states[running] * number_of_symbols + symbols
+            defined = self.defined[indexes]
+            if not defined.all():  # no transition is defined for these lanes
+                for lane, state_id, symbol_id in zip(running[~defined], states[running[~defined]], symbols[~defined]):
+                    results[lane] = f"TuringMachineError: {compiled.undefined_transition(state_id, symbol_id)}"
+                running, positions, indexes = running[defined], positions[defined], indexes[defined]
+
+            tapes[running, positions] = self.new_symbols[indexes]
+            lowest[running] = numpy.minimum(lowest[running], positions)
+            highest[running] = numpy.maximum(highest[running], positions)
+            heads[running] = positions + self.deltas[indexes]
+            states[running] = self.next_states[indexes]
+            num_step += 1
+
+            halted = self.final[states[running]]
+            if halted.any():
+                for lane in running[halted]:
+                    results[lane] = self.halted_result(
+                        starting_tapes[lane],
+                        tapes[lane],
+                        origin,
+                        lowest[lane],
+                        highest[lane],
+                        states[lane],
+                        heads[lane],
+                        num_step,
+                    )
+                running = running[~halted]
+
+        return results
+
+    def halted_result(
+        self,
+        starting_tape: str,
+        cells,
+        origin: int,
+        lowest: int,
+        highest: int,
+        state_id: int,
+        head: int,
+        num_step: int,
+    ) -> str:
+        """Returns the result of a computation that halted, as given by perform_computation_from_tape"""
+        configuration = self.turing_machine.new_configuration("")
+        configuration.state = self.compiled.states[state_id]
+        configuration.head_position = int(head) - origin
+        configuration.num_step = num_step
+        tape = configuration.tape
+        if lowest <= highest:
+            tape.reserve(int(lowest) - origin)
+            tape.reserve(int(highest) - origin)
+            tape.lowest = int(lowest) - origin + tape.origin
+            tape.highest = int(highest) - origin + tape.origin
+            written = tape.blank_cells(0)
+            written.extend(cells[lowest : highest + 1].tolist())
+            tape.cells[tape.lowest : tape.highest + 1] = written
+        return self.turing_machine.halted_result(configuration, starting_tape)
+
+
+def run_lockstep(
+    turing_machine: TuringMachine,
+    starting_tapes: Iterable[str],
+    budget: RunBudget | None = None,
+    loop_detection_steps: int = LOOP_DETECTION_STEPS,
+) -> Generator[str]:
+    """Returns a generator that yields the result of the computation from each starting tape, in the same order
+    The computations are first simulated together by a LockstepSimulator for up to LOCKSTEP_MAX_STEPS steps,
+    and the ones that haven't halted by then (or whose starting tape is invalid) are run one by one,
+    so that the results are the same as with perform_computation_from_tape"""
+    if budget is None:
+        budget = RunBudget()
+    simulator = LockstepSimulator(turing_machine)
+    starting_tapes = list(starting_tapes)
+
+    # The budget isn't checked again before the end of the first engine run (or of the watch for cycles),
+    # and a computation that halts or fails has the same result whether it is watched for cycles or not
+    max_steps = min(budget.next_check(1), LOCKSTEP_MAX_STEPS)
+    if loop_detection_steps > 1:
+        max_steps = min(max_steps, loop_detection_steps)
+
+    # Starting tapes which are invalid or already exceed the budget are left to perform_computation_from_tape
+    simulated = [
+        index
+        for index, starting_tape in enumerate(starting_tapes)
+        if all(char in turing_machine.alphabet for char in starting_tape)
+        and (budget.max_cells is None or len(starting_tape) <= budget.max_cells)
+    ]
+    results = simulator.simulate([starting_tapes[index] for index in simulated], max_steps)
+    results = {simulated[lane]: result for lane, result in results.items()}
+
+    options = {"budget": budget, "loop_detection_steps": loop_detection_steps}
+    for index, starting_tape in enumerate(starting_tapes):
+        if index in results:
+            yield results.pop(index)
+        else:
+            yield run_computation(turing_machine, starting_tape, options)
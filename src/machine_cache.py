@@ -0,0 +1,151 @@
+from turing_machine import TuringMachine
+from typing import Iterable
+import hashlib
+import os
+import pickle
+import sys
+
+# Machines cached by a previous version of the interpreter are never loaded, as the version is part of their key
+INTERPRETER_VERSION = "3"
+
+CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "tmlang")
+CACHE_FILE_EXTENSION = ".tmc"
+DIAGRAM_FILE_EXTENSION = ".tmd"  # rendered transition diagrams, named <key>.<format>.tmd
+MAX_CACHE_SIZE = 256 * 1024 * 1024  # in bytes, the least recently used machines being evicted beyond it
+HASH_CHUNK_SIZE = 1 << 20  # number of characters of the source hashed at once
+
+
+class MachineCache:
+    """
+    A cache of parsed and validated Turing machines on disk, each one stored in its own file,
+    named after the hash of the TMLang source defining it and of the interpreter version:
+
+    directory: the directory containing the cached machines
+    max_size: the total size of the cached machines, in bytes
+
+    A modified source has a new hash, so its machine is parsed again, and the old one is eventually evicted
+    The transition diagrams rendered are cached the same way, named after the hash of their graphviz source
+    """
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, max_size: int = MAX_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def source_key(self, code: str | Iterable[str]) -> str | None:
+        """Returns the key of the machine defined by the code (a string or a seekable file object),
+        or None if it can't be read twice"""
+        digest = hashlib.sha256(f"{INTERPRETER_VERSION} {sys.version}\n".encode())
+        if isinstance(code, str):
+            digest.update(code.encode())
+        elif hasattr(code, "seekable") and code.seekable():
+            position = code.tell()
+            for chunk in iter(lambda: code.read(HASH_CHUNK_SIZE), ""):
+                digest.update(chunk.encode())
+            code.seek(position)
+        else:
+            return None
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_FILE_EXTENSION)
+
+    def load(self, key: str) -> tuple[TuringMachine, int] | None:
+        """Returns the machine cached for the key, along with the line number of the end of its definition,
+        or None if it isn't cached"""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                cached = pickle.load(file)
+            os.utime(path)  # marks the machine as recently used
+            return cached
+        except FileNotFoundError:
+            return None
+        except Exception:  # the file is corrupted, or was written by an incompatible version
+            remove_file(path)
+            return None
+
+    def store(self, key: str, turing_machine: TuringMachine, line_number: int):
+        """Caches the machine, whose definition ends at line_number, and evicts the least recently used machines
+        if the cache is too big"""
+        path = self.path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary_path, "wb") as file:
+                pickle.dump((turing_machine, line_number), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)  # so that an other process never reads a partially written file
+        except (OSError, pickle.PicklingError):  # the cache is only an optimisation, the interpretation goes on
+            remove_file(temporary_path)
+            return
+        self.evict()
+
+    def diagram_key(self, diagram_source: str) -> str:
+        """Returns the key of a transition diagram, from its graphviz source"""
+        return hashlib.sha256(diagram_source.encode()).hexdigest()
+
+    def diagram_path(self, key: str, image_format: str) -> str:
+        return os.path.join(self.directory, f"{key}.{image_format}{DIAGRAM_FILE_EXTENSION}")
+
+    def load_diagram(self, key: str, image_format: str, file_name: str) -> bool:
+        """Copies the diagram cached for the key and format to file_name, and returns whether it was cached"""
+        import shutil  # imported lazily, as only diagrams are copied
+
+        path = self.diagram_path(key, image_format)
+        try:
+            shutil.copyfile(path, file_name)
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def store_diagram(self, key: str, image_format: str, file_name: str):
+        """Caches the diagram rendered to file_name, and evicts the least recently used files if the cache is too big"""
+        import shutil  # imported lazily, like in load_diagram
+        import threading
+
+        path = self.diagram_path(key, image_format)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # diagrams are rendered by threads
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            shutil.copyfile(file_name, temporary_path)
+            os.replace(temporary_path, path)
+        except OSError:
+            remove_file(temporary_path)
+            return
+        self.evict()
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """Returns the (last use time, size, path) of each cached machine and diagram"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as directory:
+                for entry in directory:
+                    if entry.name.endswith((CACHE_FILE_EXTENSION, DIAGRAM_FILE_EXTENSION)):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:  # the directory doesn't exist yet
+            pass
+        return entries
+
+    def evict(self):
+        """Removes the least recently used machines and diagrams until the cache fits in max_size"""
+        entries = self.entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            remove_file(path)
+            total_size -= size
+
+    def clear(self):
+        """Removes every cached machine and diagram"""
+        for _, _, path in self.entries():
+            remove_file(path)
+
+
+def remove_file(path: str):
+    """Removes a file, if it exists"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,174 @@
+from turing_machine import CompiledTuringMachine, Tape, TuringMachineError
+from itertools import groupby
+
+DEFAULT_BLOCK_SIZE = 1
+MACRO_BUDGET_CHECK_INTERVAL = 1 << 24  # macro transitions run many steps at once, so the budget is checked less often
+
+
+class MacroMachine:
+    """
+    Accelerated execution engine for busy-beaver-class machines, built on a compiled Turing machine:
+
+    the tape is split into blocks of block_size cells, and run-length encoded as two stacks of [block, count] runs
+    on each side of the head, the head always being on the edge of a block
+    macro transitions are computed lazily by running the machine on a single block until the head leaves it,
+    and when the head leaves the block on the other side in the same state, the macro transition is applied
+    to the whole run of identical blocks ahead at once
+
+    The results are the same as with the compiled engine, which is used for the last steps when the machine halts
+    or fails inside a block, or when a macro transition would exceed the maximum number of steps
+    """
+
+    budget_check_interval = MACRO_BUDGET_CHECK_INTERVAL
+
+    def __init__(self, compiled: CompiledTuringMachine, block_size: int = DEFAULT_BLOCK_SIZE):
+        if block_size < 1:
+            raise TuringMachineError(f"Invalid block size {block_size}: it must be at least 1")
+
+        self.compiled = compiled
+        self.block_size = block_size
+        self.blank_block = bytes(block_size)
+        # (row, block, entering on its left edge) -> macro transition, or None
+        self.transitions: dict = {}
+        # a machine staying inside a block for more steps than its number of configurations never leaves it
+        self.max_block_steps = len(compiled.states) * compiled.number_of_symbols**block_size * block_size
+
+    def macro_transition(self, row: int, block: bytes, from_left: bool) -> tuple | None:
+        """Returns (new block, new row, leaves on the right, steps, lowest written offset, highest written offset)
+        for the machine entering the block on its left (or right) edge in the state of the given row,
+        or None if the machine halts, fails, or never leaves the block"""
+        key = (row, block, from_left)
+        if key in self.transitions:
+            return self.transitions[key]
+
+        table = self.compiled.table
+        cells = bytearray(block)
+        offset = 0 if from_left else self.block_size - 1
+        lowest = highest = offset
+        transition = None
+        for steps in range(1, self.max_block_steps + 1):
+            entry = table[row + cells[offset]]
+            if entry is None:  # the machine halts or fails inside the block
+                break
+            row, cells[offset], delta = entry
+            lowest = min(lowest, offset)
+            highest = max(highest, offset)
+            offset += delta
+            if not 0 <= offset < self.block_size:
+                transition = (bytes(cells), row, offset >= self.block_size, steps, lowest, highest)
+                break
+
+        self.transitions[key] = transition
+        return transition
+
+    def encode(self, tape: Tape, head_position: int) -> tuple[list, list]:
+        """Returns the runs of blocks on the left and on the right of the head, the closest runs being last
+        Blank cells beyond the written ones aren't included"""
+        left = []
+        right = []
+        if not tape.is_empty():
+            block_size = self.block_size
+            lowest = tape.lowest - tape.origin
+            highest = tape.highest - tape.origin
+            if lowest < head_position:
+                length = -(-(head_position - lowest) // block_size) * block_size
+                cells = bytes(tape.window(head_position - length, head_position))
+                blocks = [cells[i : i + block_size] for i in range(0, length, block_size)]
+                left = [[block, len(list(run))] for block, run in groupby(blocks)]
+            if highest >= head_position:
+                length = -(-(highest + 1 - head_position) // block_size) * block_size
+                cells = bytes(tape.window(head_position, head_position + length))
+                blocks = [cells[i : i + block_size] for i in range(length - block_size, -1, -block_size)]
+                right = [[block, len(list(run))] for block, run in groupby(blocks)]
+
+        for runs in (left, right):
+            if runs and runs[0][0] == self.blank_block:
+                del runs[0]
+        return left, right
+
+    def decode(self, tape: Tape, left: list, right: list, edge: int, lowest: int | None, highest: int | None):
+        """Writes the runs of blocks back to the tape, edge being the index of the first cell of the right runs,
+        and lowest and highest the indexes of the leftmost and rightmost cells written (None if there are none)"""
+        left_cells = b"".join(block * count for block, count in left)
+        right_cells = b"".join(block * count for block, count in reversed(right))
+        tape.cells = bytearray(left_cells + right_cells)
+        tape.origin = len(left_cells) - edge
+        if lowest is None:
+            tape.lowest, tape.highest = 0, -1
+        else:
+            tape.reserve(lowest)
+            tape.reserve(highest)
+            tape.lowest = lowest + tape.origin
+            tape.highest = highest + tape.origin
+
+    def run(self, state: str, tape: Tape, head_position: int, num_step: int, max_steps: int) -> tuple[str, int, int]:
+        """Same as CompiledTuringMachine.run"""
+        compiled = self.compiled
+        if compiled.state_ids[state] in compiled.final_state_ids or num_step >= max_steps:
+            return state, head_position, num_step
+        if not isinstance(tape.cells, bytearray):  # blocks are stored as bytes
+            return compiled.run(state, tape, head_position, num_step, max_steps)
+
+        block_size = self.block_size
+        left, right = self.encode(tape, head_position)
+        lowest = None if tape.is_empty() else tape.lowest - tape.origin
+        highest = None if tape.is_empty() else tape.highest - tape.origin
+
+        # The head is on the first cell of the right runs (edge) if facing_right, and on the last cell of the left runs otherwise
+        edge = head_position
+        facing_right = True
+        row = compiled.row(compiled.state_ids[state])
+        while True:
+            runs = right if facing_right else left
+            if runs:
+                block, count = runs[-1]
+            else:  # the head is facing the infinite blank part of the tape
+                block, count = self.blank_block, None
+
+            transition = self.macro_transition(row, block, facing_right)
+            if transition is None or num_step + transition[3] > max_steps:
+                break
+            new_block, new_row, leaves_on_right, steps, lowest_offset, highest_offset = transition
+
+            # When the head leaves the block on the other side in the same state, it sweeps across the whole run
+            repetitions = 1
+            if leaves_on_right == facing_right and new_row == row:
+                repetitions = (max_steps - num_step) // steps
+                if count is not None:
+                    repetitions = min(repetitions, count)
+
+            if count is not None:
+                if repetitions == count:
+                    runs.pop()
+                else:
+                    runs[-1][1] -= repetitions
+
+            # The blocks changed are the ones from edge on the right, or before edge on the left
+            if facing_right:
+                first_block = edge
+                last_block = edge + (repetitions - 1) * block_size
+            else:
+                first_block = edge - repetitions * block_size
+                last_block = edge - block_size
+            lowest = first_block + lowest_offset if lowest is None else min(lowest, first_block + lowest_offset)
+            highest = last_block + highest_offset if highest is None else max(highest, last_block + highest_offset)
+
+            new_runs = left if leaves_on_right else right
+            if new_runs and new_runs[-1][0] == new_block:
+                new_runs[-1][1] += repetitions
+            elif new_runs or new_block != self.blank_block:  # blank blocks beyond the others are implicit
+                new_runs.append([new_block, repetitions])
+
+            if facing_right and leaves_on_right:
+                edge += repetitions * block_size
+            elif not facing_right and not leaves_on_right:
+                edge -= repetitions * block_size
+            facing_right = leaves_on_right
+            row = new_row
+            num_step += repetitions * steps
+
+        # The last steps are run by the compiled engine
+        self.decode(tape, left, right, edge, lowest, highest)
+        state = compiled.states[row // compiled.number_of_symbols]
+        head_position = edge if facing_right else edge - 1
+        return compiled.run(state, tape, head_position, num_step, max_steps)
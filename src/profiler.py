@@ -0,0 +1,136 @@
+from turing_machine import TuringMachine, CompiledTuringMachine, Tape, BUDGET_CHECK_INTERVAL, TRANSITION_TABLE_STYLE
+import time
+
+PROFILE_SAMPLE_INTERVAL = 1024  # initial number of steps between two samples of the tape growth
+MAX_GROWTH_SAMPLES = 32  # beyond it, every other sample is dropped and the interval between samples doubled
+HISTOGRAM_BINS = 16
+HISTOGRAM_WIDTH = 40  # number of characters of the longest bar
+
+
+class Profiler:
+    """
+    Execution engine counting where the steps of a computation go, with a few array-indexed increments per step:
+
+    hits[i]: the number of times the entry i of the compiled machine's flattened table was used
+    visits[i]: the number of steps the head spent on the cell i - visits_origin of the tape
+    growth: the (num_step, number of tape cells used) sampled every sample_interval steps
+    elapsed: the time spent running the computation, in seconds
+
+    It is used as the engine of TuringMachine.compute, which mustn't watch the computation for cycles
+    (loop_detection_steps=0), so that every step is counted
+    """
+
+    budget_check_interval = BUDGET_CHECK_INTERVAL
+
+    def __init__(self, compiled: CompiledTuringMachine):
+        self.compiled = compiled
+        self.hits = [0] * len(compiled.table)
+        self.visits = []
+        self.visits_origin = 0
+        self.growth = []
+        self.sample_interval = PROFILE_SAMPLE_INTERVAL
+        self.next_sample = None
+        self.elapsed = 0.0
+
+    def run(self, state: str, tape: Tape, head_position: int, num_step: int, max_steps: int) -> tuple[str, int, int]:
+        """Same as CompiledTuringMachine.run, each step being counted"""
+        compiled = self.compiled
+        start_time = time.perf_counter()
+        try:
+            while num_step < max_steps and compiled.state_ids[state] not in compiled.final_state_ids:
+                if self.next_sample is None or num_step >= self.next_sample:
+                    self.sample(num_step, tape)
+                state, head_position, num_step = self.run_counted(
+                    state, tape, head_position, num_step, min(max_steps, self.next_sample)
+                )
+        finally:
+            self.elapsed += time.perf_counter() - start_time
+        return state, head_position, num_step
+
+    def sample(self, num_step: int, tape: Tape):
+        self.growth.append((num_step, tape.used_cells()))
+        if len(self.growth) > MAX_GROWTH_SAMPLES:
+            self.growth = self.growth[::2]
+            self.sample_interval *= 2
+        self.next_sample = num_step + self.sample_interval
+
+    def run_counted(
+        self, state: str, tape: Tape, head_position: int, num_step: int, max_steps: int
+    ) -> tuple[str, int, int]:
+        """CompiledTuringMachine.run_counted, with the counters kept aligned with the tape's cells"""
+        tape.reserve(head_position)
+
+        # visits is kept aligned with the tape's cells, which may have grown since the last run
+        if tape.origin > self.visits_origin:
+            self.visits[0:0] = [0] * (tape.origin - self.visits_origin)
+        self.visits.extend([0] * (len(tape.cells) - len(self.visits)))
+        try:
+            return self.compiled.run_counted(state, tape, head_position, num_step, max_steps, self.hits, self.visits)
+        finally:
+            self.visits_origin = tape.origin
+
+    def transition_hits(self, turing_machine: TuringMachine) -> dict:
+        """Returns the number of times each transition (start state, symbol read) was used"""
+        compiled = self.compiled
+        return {
+            (state, symbol): self.hits[compiled.row(compiled.state_ids[state]) + compiled.symbol_ids[symbol]]
+            for state, symbol in turing_machine.transition_function.as_dict()
+        }
+
+    def state_visits(self) -> list[int]:
+        """Returns the number of steps spent in each state, indexed by state id"""
+        number_of_symbols = self.compiled.number_of_symbols
+        return [sum(self.hits[row : row + number_of_symbols]) for row in range(0, len(self.hits), number_of_symbols)]
+
+    def head_histogram(self) -> list[tuple[int, int, int]]:
+        """Returns the (first position, last position, number of steps) of each bin of head positions"""
+        visited = [index for index, count in enumerate(self.visits) if count]
+        if not visited:
+            return []
+        start, stop = visited[0], visited[-1] + 1
+        bin_size = -(-(stop - start) // HISTOGRAM_BINS)
+        return [
+            (
+                bin_start - self.visits_origin,
+                min(bin_start + bin_size, stop) - 1 - self.visits_origin,
+                sum(self.visits[bin_start : bin_start + bin_size]),
+            )
+            for bin_start in range(start, stop, bin_size)
+        ]
+
+    def report(self, turing_machine: TuringMachine) -> str:
+        """Returns the profile of the computation, the machine's configuration being the one it ended with"""
+        from prettytable import PrettyTable, TableStyle  # imported lazily, like in TransitionFunction
+
+        steps = sum(self.hits)
+        speed = f"{steps / self.elapsed:,.0f} steps/s" if self.elapsed else "too fast to be timed"
+        lines = [f"Profile of the computation of '{turing_machine.name}' ({steps} steps, {speed} while profiling):"]
+
+        lines.append("\nTransitions:")
+        lines.append(turing_machine.transition_function.transition_table(hits=self.transition_hits(turing_machine)))
+
+        lines.append("\nStates:")
+        table = PrettyTable(["State", "Steps", "Share"])
+        for state, count in zip(self.compiled.states, self.state_visits()):
+            if state not in turing_machine.final_states:
+                table.add_row([state, count, f"{count / steps:.1%}" if steps else "-"])
+        table.set_style(TableStyle[TRANSITION_TABLE_STYLE])
+        lines.append(table.get_string())
+
+        histogram = self.head_histogram()
+        if histogram:
+            lines.append(f"\nHead positions, from {histogram[0][0]} to {histogram[-1][1]}:")
+            largest = max(count for _, _, count in histogram)
+            width = max(len(f"{first} to {last}") for first, last, _ in histogram)
+            for first, last, count in histogram:
+                bar = "█" * round(count * HISTOGRAM_WIDTH / largest)
+                lines.append(f"{f'{first} to {last}':>{width}} {bar} {count}")
+
+        lines.append("\nTape cells used:")
+        growth = self.growth
+        if not growth or growth[-1][0] != turing_machine.configuration.num_step:
+            growth = growth + [(turing_machine.configuration.num_step, turing_machine.tape.used_cells())]
+        for num_step, used_cells in growth:
+            lines.append(f"step {num_step}: {used_cells} cells")
+
+        return "\n".join(lines)
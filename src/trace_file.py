@@ -0,0 +1,268 @@
+from turing_machine import CompiledTuringMachine, Configuration, Tape, TuringMachineError, BUDGET_CHECK_INTERVAL
+from bisect import bisect_right
+from array import array
+import argparse
+import json
+import mmap
+import struct
+
+# A trace file is made of a header, chunks, and a footer written when the computation is over:
+# header: TRACE_MAGIC, then the length and the JSON of the metadata (states, symbols, snapshot interval)
+# chunk: a snapshot of the configuration at its first step, followed by one record per step
+# footer: the offset of each chunk, the final configuration, and TRACE_END_MAGIC
+# A trace whose footer is missing (if the computation was killed) can still be read, up to its last chunk
+TRACE_MAGIC = b"TMTRACE1"
+TRACE_END_MAGIC = b"TMTREND1"
+DEFAULT_SNAPSHOT_INTERVAL = 65536  # number of steps between two snapshots of the tape
+
+METADATA_LENGTH = struct.Struct("<I")
+# num_step, state id, head position, position of the first cell, number of cells, number of records
+SNAPSHOT = struct.Struct("<QIqqQI")
+# state id, symbol read, symbol written, head delta
+RECORD = struct.Struct("<IHHb")
+# final num_step, final state id, final head position, number of chunks
+FOOTER = struct.Struct("<QIqQ")
+CHUNK_OFFSET = struct.Struct("<Q")
+
+
+class TraceWriter:
+    """
+    Execution engine recording every step of a computation to a binary trace file, to be read by a TraceReader:
+    each step is stored as a fixed-size record (state id, symbol read, symbol written, head delta),
+    and the whole configuration is stored every snapshot_interval steps
+
+    It is used as the engine of TuringMachine.compute through its recorder argument
+    """
+
+    budget_check_interval = BUDGET_CHECK_INTERVAL
+
+    def __init__(self, path: str, compiled: CompiledTuringMachine, snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL):
+        if compiled.number_of_symbols > 1 << 16:
+            raise TuringMachineError("Can't record a trace for a machine with more than 65536 symbols")
+        if snapshot_interval < 1:
+            raise TuringMachineError(f"Invalid snapshot interval {snapshot_interval}: it must be at least 1")
+
+        self.path = path
+        self.compiled = compiled
+        self.snapshot_interval = snapshot_interval
+        self.file = None
+        self.chunk_offsets = []
+        self.chunk_start = None  # the num_step of the current chunk's snapshot
+        self.position = None  # the (state, head position, num_step) of the last step recorded
+        self.snapshot = b""
+        self.records = bytearray()
+
+    def start(self, configuration: Configuration):
+        """Creates the trace file, for a computation starting from the configuration"""
+        metadata = json.dumps(
+            {
+                "states": self.compiled.states,
+                "symbols": self.compiled.symbols,
+                "snapshot_interval": self.snapshot_interval,
+            }
+        ).encode()
+        self.file = open(self.path, "wb")
+        self.file.write(TRACE_MAGIC + METADATA_LENGTH.pack(len(metadata)) + metadata)
+        c = configuration
+        self.position = (c.state, c.head_position, c.num_step)
+        self.start_chunk(c.state, c.tape, c.head_position, c.num_step)
+
+    def start_chunk(self, state: str, tape: Tape, head_position: int, num_step: int):
+        """Writes the current chunk to the file, and starts a new one with a snapshot of the configuration"""
+        self.flush_chunk()
+        self.chunk_start = num_step
+        if tape.is_empty():
+            first_cell, cells = 0, b""
+        else:
+            first_cell, cells = tape.lowest - tape.origin, tape.cells[tape.lowest : tape.highest + 1]
+            cells = array("H", cells).tobytes() if len(self.compiled.symbols) > 256 else bytes(cells)
+        self.snapshot = (
+            num_step,
+            self.compiled.state_ids[state],
+            head_position,
+            first_cell,
+            len(cells) // (2 if len(self.compiled.symbols) > 256 else 1),
+            cells,
+        )
+
+    def flush_chunk(self):
+        if self.chunk_start is None:
+            return
+        num_step, state_id, head_position, first_cell, number_of_cells, cells = self.snapshot
+        self.chunk_offsets.append(self.file.tell())
+        number_of_records = len(self.records) // RECORD.size
+        self.file.write(
+            SNAPSHOT.pack(num_step, state_id, head_position, first_cell, number_of_cells, number_of_records)
+        )
+        self.file.write(cells)
+        self.file.write(self.records)
+        self.records = bytearray()
+        self.chunk_start = None
+
+    def run(self, state: str, tape: Tape, head_position: int, num_step: int, max_steps: int) -> tuple[str, int, int]:
+        """Same as CompiledTuringMachine.run, each step being recorded"""
+        compiled = self.compiled
+        table = compiled.table
+        try:
+            while num_step < max_steps and compiled.state_ids[state] not in compiled.final_state_ids:
+                if num_step - self.chunk_start >= self.snapshot_interval:
+                    self.start_chunk(state, tape, head_position, num_step)
+
+                state_id = compiled.state_ids[state]
+                index = head_position + tape.origin
+                symbol_read = tape.cells[index] if 0 <= index < len(tape.cells) else 0
+                state, head_position, num_step = compiled.run(state, tape, head_position, num_step, num_step + 1)
+                _, symbol_written, delta = table[compiled.row(state_id) + symbol_read]
+                self.records += RECORD.pack(state_id, symbol_read, symbol_written, delta)
+        finally:  # the computation may stop on an undefined transition, before its configuration is updated
+            self.position = (state, head_position, num_step)
+
+        return state, head_position, num_step
+
+    def close(self):
+        """Writes the last chunk and the footer, with the configuration reached by the last step recorded"""
+        if self.file is None:
+            return
+        self.flush_chunk()
+        state, head_position, num_step = self.position
+        self.file.write(b"".join(CHUNK_OFFSET.pack(offset) for offset in self.chunk_offsets))
+        self.file.write(FOOTER.pack(num_step, self.compiled.state_ids[state], head_position, len(self.chunk_offsets)))
+        self.file.write(TRACE_END_MAGIC)
+        self.file.close()
+        self.file = None
+
+
+class TraceReader:
+    """
+    Reads a trace file written by a TraceWriter, which is memory-mapped rather than loaded:
+
+    states and symbols: the states and symbols of the machine, indexed by their ids
+    first_step and last_step: the first and last steps whose configuration can be rebuilt
+    chunks: the (first step, offset) of each chunk
+    """
+
+    def __init__(self, path: str):
+        try:
+            with open(path, "rb") as file:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as error:  # mmap raises a ValueError for an empty file
+            raise TuringMachineError(
+                f"Cannot read the trace file '{path}' ({getattr(error, 'strerror', None) or error})"
+            )
+        if self.map[: len(TRACE_MAGIC)] != TRACE_MAGIC:
+            raise TuringMachineError(f"'{path}' isn't a trace file")
+
+        (metadata_length,) = METADATA_LENGTH.unpack_from(self.map, len(TRACE_MAGIC))
+        metadata_start = len(TRACE_MAGIC) + METADATA_LENGTH.size
+        metadata = json.loads(self.map[metadata_start : metadata_start + metadata_length])
+        self.states = metadata["states"]
+        self.symbols = metadata["symbols"]
+        self.cell_size = 2 if len(self.symbols) > 256 else 1
+
+        self.final = None  # the final (num_step, state id, head position), if the trace is complete
+        offsets = self.read_footer()
+        if offsets is None:  # the chunks are found one after the other
+            offsets = []
+            offset = metadata_start + metadata_length
+            while offset + SNAPSHOT.size <= len(self.map):
+                _, _, _, _, number_of_cells, number_of_records = SNAPSHOT.unpack_from(self.map, offset)
+                end = offset + SNAPSHOT.size + number_of_cells * self.cell_size + number_of_records * RECORD.size
+                if end > len(self.map):  # the chunk was partially written
+                    break
+                offsets.append(offset)
+                offset = end
+        if not offsets:
+            raise TuringMachineError(f"The trace file '{path}' doesn't contain any step")
+
+        self.chunks = [(SNAPSHOT.unpack_from(self.map, offset)[0], offset) for offset in offsets]
+        self.first_step = self.chunks[0][0]
+        if self.final is not None:
+            self.last_step = self.final[0]
+        else:
+            last_start, last_offset = self.chunks[-1]
+            self.last_step = last_start + SNAPSHOT.unpack_from(self.map, last_offset)[5] - 1
+
+    def read_footer(self) -> list[int] | None:
+        """Returns the offsets of the chunks given by the footer, or None if it is missing"""
+        if len(self.map) < FOOTER.size + len(TRACE_END_MAGIC) or self.map[-len(TRACE_END_MAGIC) :] != TRACE_END_MAGIC:
+            return None
+        footer_start = len(self.map) - len(TRACE_END_MAGIC) - FOOTER.size
+        num_step, state_id, head_position, number_of_chunks = FOOTER.unpack_from(self.map, footer_start)
+        self.final = (num_step, state_id, head_position)
+        offsets_start = footer_start - number_of_chunks * CHUNK_OFFSET.size
+        return [
+            CHUNK_OFFSET.unpack_from(self.map, offsets_start + i * CHUNK_OFFSET.size)[0]
+            for i in range(number_of_chunks)
+        ]
+
+    def record(self, num_step: int) -> tuple[str, str, str, int]:
+        """Returns the (state, symbol read, symbol written, head delta) of a step"""
+        start, offset = self.chunks[bisect_right(self.chunks, (num_step, float("inf"))) - 1]
+        _, _, _, _, number_of_cells, number_of_records = SNAPSHOT.unpack_from(self.map, offset)
+        if not 0 <= num_step - start < number_of_records:
+            raise TuringMachineError(f"Step {num_step} isn't recorded in the trace")
+        records_offset = offset + SNAPSHOT.size + number_of_cells * self.cell_size
+        state_id, symbol_read, symbol_written, delta = RECORD.unpack_from(
+            self.map, records_offset + (num_step - start) * RECORD.size
+        )
+        return self.states[state_id], self.symbols[symbol_read], self.symbols[symbol_written], delta
+
+    def configuration_at(self, num_step: int) -> Configuration:
+        """Returns the configuration of the computation at a step, rebuilt from the closest snapshot before it"""
+        if not self.first_step <= num_step <= self.last_step:
+            raise TuringMachineError(
+                f"Step {num_step} isn't in the trace (steps {self.first_step} to {self.last_step})"
+            )
+
+        start, offset = self.chunks[bisect_right(self.chunks, (num_step, float("inf"))) - 1]
+        _, state_id, head_position, first_cell, number_of_cells, number_of_records = SNAPSHOT.unpack_from(
+            self.map, offset
+        )
+        cells_offset = offset + SNAPSHOT.size
+        records_offset = cells_offset + number_of_cells * self.cell_size
+
+        tape = Tape("", blank_symbol=self.symbols[0], symbols=self.symbols)
+        if number_of_cells:
+            snapshot_cells = self.map[cells_offset:records_offset]
+            if self.cell_size == 2:
+                snapshot_cells = array("H", snapshot_cells)
+            tape.reserve(first_cell)
+            tape.reserve(first_cell + number_of_cells - 1)
+            tape.lowest = first_cell + tape.origin
+            tape.highest = tape.lowest + number_of_cells - 1
+            tape.cells[tape.lowest : tape.highest + 1] = snapshot_cells
+
+        for record_offset in range(records_offset, records_offset + (num_step - start) * RECORD.size, RECORD.size):
+            _, _, symbol_written, delta = RECORD.unpack_from(self.map, record_offset)
+            tape[head_position] = self.symbols[symbol_written]
+            head_position += delta
+
+        if num_step - start < number_of_records:
+            state_id = RECORD.unpack_from(self.map, records_offset + (num_step - start) * RECORD.size)[0]
+        elif num_step != start:  # the step after the last record is the last one of the computation
+            state_id = self.final[1]
+        return Configuration(self.states[state_id], tape, head_position, num_step)
+
+    def close(self):
+        self.map.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a trace recorded by TMLang with the record option of #run")
+    parser.add_argument("filename", help="the path to the trace file")
+    parser.add_argument("steps", type=int, nargs="*", help="the steps whose configuration is printed")
+    args = parser.parse_args()
+
+    try:
+        reader = TraceReader(args.filename)
+        print(f"Trace of steps {reader.first_step} to {reader.last_step}" + ("" if reader.final else " (incomplete)"))
+        for num_step in args.steps:
+            configuration = reader.configuration_at(num_step)
+            print(f"\nStep {num_step}, with state '{configuration.state}':\n{configuration.get_tape()}")
+        reader.close()
+    except TuringMachineError as error:
+        print(f"TuringMachineError: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,269 @@
-from prettytable import PrettyTable, TableStyle
 from typing import Generator
-import graphviz
+from collections import deque
+from itertools import islice
+from functools import lru_cache
+from array import array
+import time
+
+# prettytable (and its dependency wcwidth) and graphviz are only imported when a table or diagram is needed,
+# to speed up startup
 
 # Symbol definitions
 GO_LEFT_SYMBOL = "L"
 GO_RIGHT_SYMBOL = "R"
 STAY_IN_PLACE_SYMBOL = "N"
 
-TRANSITION_TABLE_STYLE = TableStyle.SINGLE_BORDER
+# Head movement for each direction symbol, used by the compiled engine
+HEAD_DELTAS = {GO_LEFT_SYMBOL: -1, GO_RIGHT_SYMBOL: 1, STAY_IN_PLACE_SYMBOL: 0}
+
+TRANSITION_TABLE_STYLE = "SINGLE_BORDER"  # name of a prettytable.TableStyle
+TRANSITION_TABLE_FIELDS = ("Current state", "Scanned symbol", "Next state", "Print symbol", "Moving direction")
+# The characters of the single border style, with which transition tables are written line by line
+TABLE_BORDERS = {"top": "┌┬┐", "separator": "├┼┤", "bottom": "└┴┘", "horizontal": "─", "vertical": "│"}
+TABLE_CHUNK_LINES = 4096  # number of lines of a transition table joined in each chunk of a formal definition
 
-MAX_NUMBER_OF_STEPS = 2000
+MAX_NUMBER_OF_STEPS = 2000  # default step budget of a computation
+BUDGET_CHECK_INTERVAL = 65536  # number of steps run by the compiled engine between two checks of the budget
+DEFAULT_CHECKPOINT_INTERVAL = 60  # minimum number of seconds between two checkpoints (see checkpoint.Checkpointer)
+
+LOOP_DETECTION_STEPS = 10000  # default number of steps during which a computation is watched for cycles
+ZOBRIST_MASK = (1 << 64) - 1
+ZOBRIST_HASHES_CACHED = 1 << 16  # number of (cell, symbol) hashes kept, the least recently used being dropped
+TRANSLATED_CYCLE_WINDOW = 1024  # number of cells kept left (or right) of the head when it reaches new cells
+TRANSLATED_CYCLE_CANDIDATES = 32  # number of previous records compared with a new one, for each state
 
 
 class TuringMachineError(Exception):  # A custom error for Turing machines
     pass
 
 
+class ValidationIssue:
+    """
+    A problem found when validating a Turing machine:
+
+    message: the description of the problem
+    key: the (state, symbol) of the transition concerned, or one of the attributes BLANK_SYMBOL, INITIAL_STATE
+    and FINAL_STATES if the problem comes from the definition of these values
+    is_error: False if the machine is valid anyway (like for a missing transition)
+    line_number: the 0-based line of the source defining key, if known
+    """
+
+    BLANK_SYMBOL = "blank symbol"
+    INITIAL_STATE = "initial state"
+    FINAL_STATES = "final states"
+
+    def __init__(self, message: str, key: tuple | str | None = None, is_error: bool = True):
+        self.message = message
+        self.key = key
+        self.is_error = is_error
+        self.line_number = None
+
+    def __str__(self) -> str:
+        if self.line_number is None:
+            return self.message
+        return f"line {self.line_number + 1}: {self.message}"
+
+
+class InvalidTuringMachineError(TuringMachineError):
+    """Raised when a Turing machine isn't valid, issues being the list of all its errors"""
+
+    def __init__(self, issues: list[ValidationIssue]):
+        super().__init__("\n".join(map(str, issues)))
+        self.issues = issues
+
+
 class Tape:
-    """A class for the Turing machine's tape"""
+    """
+    A class for the Turing machine's tape, stored as a contiguous array of symbol ids growing in both directions:
+
+    symbols[i] is the symbol stored as i in cells (the blank symbol being 0), and cells[origin] is the tape's cell 0
+    lowest and highest are the indexes in cells of the leftmost and rightmost cells written so far
+    """
 
-    def __init__(self, starting_configuration: str, blank_symbol: str):
+    def __init__(self, starting_configuration: str, blank_symbol: str, symbols: list | None = None):
         self.blank_symbol = blank_symbol
-        self.tape: dict = {}
-        for i in range(len(starting_configuration)):
-            self.tape[i] = starting_configuration[i]
+        self.symbols = list(symbols) if symbols is not None else [blank_symbol]
+        if self.symbols[0] != blank_symbol:
+            raise TuringMachineError(f"Invalid tape symbols: the blank symbol '{blank_symbol}' must come first")
+        self.symbol_ids = {symbol: symbol_id for symbol_id, symbol in enumerate(self.symbols)}
+        self.translation_table = None  # used by render when every symbol is a single latin-1 character
+
+        self.cells = self.blank_cells(0)
+        self.cells.extend([self.intern_symbol(char) for char in starting_configuration])
+        self.origin = 0
+        self.lowest = 0
+        self.highest = len(self.cells) - 1
+
+    def intern_symbol(self, symbol: str) -> int:
+        """Returns the id of the symbol, allocating a new one if needed"""
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.translation_table = None
+            if len(self.symbols) > 256 and isinstance(self.cells, bytearray):
+                self.cells = array("H", self.cells)  # ids don't fit in a byte anymore
+        return self.symbol_ids[symbol]
+
+    def blank_cells(self, length: int) -> bytearray | array:
+        """Returns length blank cells, stored in a bytearray whenever the symbol ids fit in a byte"""
+        if len(self.symbols) <= 256:
+            return bytearray(length)
+        return array("H", bytes(length * 2))
+
+    def grow_left(self) -> int:
+        """Doubles the size of the tape to the left, and returns the shift applied to indexes in cells"""
+        shift = max(len(self.cells), 1)
+        self.cells[0:0] = self.blank_cells(shift)
+        self.origin += shift
+        self.lowest += shift
+        self.highest += shift
+        return shift
+
+    def grow_right(self):
+        """Doubles the size of the tape to the right"""
+        self.cells.extend(self.blank_cells(max(len(self.cells), 1)))
+
+    def reserve(self, index: int) -> int:
+        """Makes sure the cell at index is allocated, and returns its index in cells"""
+        while index + self.origin < 0:
+            self.grow_left()
+        while index + self.origin >= len(self.cells):
+            self.grow_right()
+        return index + self.origin
+
+    def is_empty(self) -> bool:
+        return self.lowest > self.highest
+
+    def used_cells(self) -> int:
+        """Returns the number of cells between the leftmost and rightmost cells written so far"""
+        return max(self.highest - self.lowest + 1, 0)
+
+    def copy(self) -> "Tape":
+        tape = Tape("", blank_symbol=self.blank_symbol, symbols=self.symbols)
+        tape.cells = self.cells[:]
+        tape.origin = self.origin
+        tape.lowest = self.lowest
+        tape.highest = self.highest
+        return tape
+
+    def window(self, start: int, stop: int) -> bytearray | array:
+        """Returns the symbol ids of the cells from index start to stop (excluded)"""
+        start += self.origin
+        stop += self.origin
+        cells = self.cells[max(start, 0) : max(stop, 0)]
+        if start < 0:
+            cells[0:0] = self.blank_cells(min(-start, stop - start))
+        if stop > len(self.cells):
+            cells.extend(self.blank_cells(min(stop - len(self.cells), stop - start)))
+        return cells
+
+    def contents(self) -> tuple:
+        """Returns the index of the first non-blank cell and the symbol ids up to the last non-blank one,
+        so that two tapes have the same contents if and only if they are equal"""
+        start = self.lowest
+        stop = self.highest + 1
+        while start < stop and not self.cells[start]:
+            start += 1
+        while stop > start and not self.cells[stop - 1]:
+            stop -= 1
+        if start == stop:
+            return 0, self.blank_cells(0)
+        return start - self.origin, self.cells[start:stop]
 
     def __getitem__(self, index: int) -> str:
-        if index in self.tape:
-            return self.tape[index]
+        index += self.origin
+        if 0 <= index < len(self.cells):
+            return self.symbols[self.cells[index]]
         else:
             return self.blank_symbol
 
     def __setitem__(self, index: int, char: str):
-        self.tape[index] = char
+        symbol_id = self.intern_symbol(char)
+        index = self.reserve(index)
+        self.cells[index] = symbol_id
+        if self.is_empty():
+            self.lowest = self.highest = index
+        elif index < self.lowest:
+            self.lowest = index
+        elif index > self.highest:
+            self.highest = index
+
+    def render(self, start: int, stop: int) -> str:
+        """Returns the symbols in cells[start:stop] (indexes in cells, possibly outside the allocated ones)"""
+        padding_left = max(-start, 0)
+        padding_right = max(stop - len(self.cells), 0)
+        cells = self.cells[max(start, 0) : stop]
+
+        if self.translation_table is None:  # computed lazily, False if the symbols can't be rendered by a translation
+            self.translation_table = isinstance(self.cells, bytearray) and all(
+                len(symbol) == 1 and ord(symbol) < 256 for symbol in self.symbols
+            )
+            if self.translation_table:
+                self.translation_table = bytes(ord(symbol) for symbol in self.symbols).ljust(256, b"\0")
+        if self.translation_table:
+            rendered = cells.translate(self.translation_table).decode("latin-1")
+        else:
+            rendered = "".join(map(self.symbols.__getitem__, cells))
+
+        return self.blank_symbol * padding_left + rendered + self.blank_symbol * padding_right
 
     def __str__(self) -> str:
-        output = ""
-        if self.tape == {}:  # if self.tape is empty, there will be a ValueError when calling min and max
+        if self.is_empty():
             return ""
-        min_used_index = min(self.tape.keys())
-        max_used_index = max(self.tape.keys())
-
-        for i in range(min_used_index, max_used_index + 1):
-            if i in self.tape:
-                output += self.tape[i]
-            else:
-                output += self.blank_symbol
-
-        return output
+        return self.render(self.lowest, self.highest + 1)
 
     def render_with_pos_indicator(self, head_position: int) -> str:
-        output = ""
-        if self.tape == {}:  # if self._tape is empty, there will be a ValueError when calling min and max
+        if self.is_empty():
             return ""
-        min_used_index = min(self.tape.keys())
-        max_used_index = max(self.tape.keys())
-
-        # We update max_used_index or min_used_index with head_position if necessary
-        if head_position > max_used_index:
-            max_used_index = head_position
-        if head_position < min_used_index:
-            min_used_index = head_position
-
-        for i in range(min_used_index, max_used_index + 1):
-            if i in self.tape:
-                output += self.tape[i]
-            else:
-                output += self.blank_symbol
 
-        output += "\n" + " " * (head_position - min_used_index) + "^"  # adds a position pointer
-        return output
+        # We extend the rendered part with head_position if necessary
+        head_index = head_position + self.origin
+        start = min(self.lowest, head_index)
+        stop = max(self.highest, head_index) + 1
+
+        return self.render(start, stop) + "\n" + " " * (head_index - start) + "^"  # adds a position pointer
+
+    def render_window(self, head_position: int, width: int) -> str:
+        """Same as render_with_pos_indicator, except only the width cells around the head are rendered,
+        so that the time taken doesn't depend on the size of the tape"""
+        start = head_position + self.origin - width // 2
+        return self.render(start, start + width) + "\n" + " " * (width // 2) + "^"
+
+
+class RunBudget:
+    """
+    Limits for a single computation, None meaning no limit:
+
+    max_steps: the number of steps after which the computation is stopped
+    max_time: the wall-clock time (in seconds) after which the computation is stopped
+    max_cells: the number of tape cells the computation can use
+    """
+
+    def __init__(
+        self,
+        max_steps: int | None = MAX_NUMBER_OF_STEPS,
+        max_time: float | None = None,
+        max_cells: int | None = None,
+    ):
+        self.max_steps = max_steps
+        self.max_time = max_time
+        self.max_cells = max_cells
+
+    def next_check(self, num_step: int, interval: int = BUDGET_CHECK_INTERVAL) -> int:
+        """Returns the step at which the budget should be checked next"""
+        if self.max_steps is None:
+            return num_step + interval
+        return min(num_step + interval, self.max_steps)
+
+    def exceeded(self, num_step: int, start_time: float, tape: Tape) -> str | None:
+        """Returns a description of the budget exceeded by the computation, or None if it can go on"""
+        if self.max_steps is not None and num_step >= self.max_steps:
+            return f"step budget of {self.max_steps} steps"
+        if self.max_time is not None and time.perf_counter() - start_time >= self.max_time:
+            return f"time budget of {self.max_time}s"
+        if self.max_cells is not None and tape.used_cells() > self.max_cells:
+            return f"memory budget of {self.max_cells} cells"
+        return None
 
 
 class TransitionFunction:
@@ -78,23 +272,68 @@ class TransitionFunction:
         # {(current state, symbol scanned): (next state, new symbol, moving direction), etc...}
         self.transition_function = transition_function
 
-    def transition_table(self) -> str:
-        """Outputs the transition table as a string"""
-        table = PrettyTable(
-            [
-                "Current state",
-                "Scanned symbol",
-                "Next state",
-                "Print symbol",
-                "Moving direction",
-            ]
-        )
-
-        for key, value in self.transition_function.items():
-            table.add_row([key[0], key[1], value[0], value[1], value[2]])
-
-        table.set_style(TRANSITION_TABLE_STYLE)
-        return table.get_string()
+    def transition_table(self, hits: dict | None = None, start: int = 0, stop: int | None = None) -> str:
+        """Outputs the transition table as a string
+        If hits is given, the number of times each transition (start state, symbol read) was used is shown too"""
+        return "\n".join(self.transition_table_lines(hits, start, stop))
+
+    def transition_table_lines(
+        self, hits: dict | None = None, start: int = 0, stop: int | None = None
+    ) -> Generator[str, None, None]:
+        """Yields the lines of the transition table of the transitions start to stop (by default, all of them),
+        in the same layout as a prettytable with TRANSITION_TABLE_STYLE, without building the whole table at once
+        The width of each column is computed first, each distinct cell in it being measured once"""
+        from wcwidth import wcswidth
+
+        def display_width(text: str) -> int:
+            if text.isascii() and text.isprintable():
+                return len(text)
+            width = wcswidth(text)
+            return width if width >= 0 else len(text)
+
+        def padded_cell(text: str, width: int) -> str:  # centered the same way as str.center
+            margin = width - display_width(text)
+            left = margin // 2 + (margin & width & 1)
+            return " " * (left + 1) + text + " " * (margin - left + 1)
+
+        transitions = self.transition_function.items()
+        if start or stop is not None:
+            transitions = list(islice(transitions, start, stop))
+        columns = [
+            {key[0] for key, _ in transitions},
+            {key[1] for key, _ in transitions},
+            {value[0] for _, value in transitions},
+            {value[1] for _, value in transitions},
+            {value[2] for _, value in transitions},
+        ]
+        fields = TRANSITION_TABLE_FIELDS
+        if hits is not None:
+            fields += ("Hits",)
+            columns.append({str(hits[key]) for key, _ in transitions})
+        widths = [max(map(display_width, column), default=0) for column in columns]
+        widths = [max(width, display_width(field)) for width, field in zip(widths, fields)]
+        # the cell of each distinct value, with its padding, is only built once
+        cells = [{text: padded_cell(text, width) for text in column} for column, width in zip(columns, widths)]
+
+        vertical = TABLE_BORDERS["vertical"]
+
+        def rule(kind: str) -> str:
+            left, middle, right = TABLE_BORDERS[kind]
+            return left + middle.join(TABLE_BORDERS["horizontal"] * (width + 2) for width in widths) + right
+
+        yield rule("top")
+        yield vertical + vertical.join(padded_cell(field, width) for field, width in zip(fields, widths)) + vertical
+        yield rule("separator")
+        current_states, scanned_symbols, next_states, print_symbols, directions = cells[:5]
+        for key, value in transitions:
+            line = (
+                f"{vertical}{current_states[key[0]]}{vertical}{scanned_symbols[key[1]]}{vertical}"
+                f"{next_states[value[0]]}{vertical}{print_symbols[value[1]]}{vertical}{directions[value[2]]}{vertical}"
+            )
+            if hits is not None:
+                line += f"{cells[5][str(hits[key])]}{vertical}"
+            yield line
+        yield rule("bottom")
 
     def __str__(self) -> str:
         return self.transition_table()
@@ -105,47 +344,558 @@ class TransitionFunction:
     def as_dict(self) -> dict:
         return self.transition_function
 
-    def verify_validity(
+    def validate(
         self,
         possible_states: tuple | list,
         alphabet: tuple | list,
         final_states: tuple | list,
-    ):
-        """Raises a TuringMachineError if the transition function isn't in the right format - doesn't return anything"""
+    ) -> list["ValidationIssue"]:
+        """Returns every error of the definitions of the transition function, in a single pass, in linear time
+        The missing transitions aren't errors, and are only listed by missing_transitions"""
+        possible_states_set = set(possible_states)
+        alphabet_set = set(alphabet)
+        final_states_set = set(final_states)
+        directions = set(HEAD_DELTAS)
+        issues = []
+
         for key, value in self.transition_function.items():
             if not len(key) == 2:
-                raise TuringMachineError(
-                    f"Transition function not valid: expected 2 inputs for each transition function defnintion, got {len(key)}"
+                issues.append(
+                    ValidationIssue(
+                        f"Transition function not valid: expected 2 inputs for each transition function defnintion, got {len(key)}",
+                        key,
+                    )
                 )
+                continue
 
             if not len(value) == 3:
-                raise TuringMachineError(
-                    f"Transition function not valid: expected 3 outputs for each transition function defnintion, got {len(value)}"
+                issues.append(
+                    ValidationIssue(
+                        f"Transition function not valid: expected 3 outputs for each transition function defnintion, got {len(value)}",
+                        key,
+                    )
                 )
+                continue
 
-            start_state = key[0]
-            symbol_read = key[1]
-            new_state = value[0]
-            new_symbol = value[1]
-            direction = value[2]
+            start_state, symbol_read = key
+            new_state, new_symbol, direction = value
+
+            if start_state in final_states_set:
+                issues.append(ValidationIssue(f"Transition function not valid: state '{key[0]}' is a final state", key))
+
+            if start_state not in possible_states_set:
+                issues.append(ValidationIssue(f"Transition function not valid: '{key[0]}' not in possible states", key))
+
+            if new_state not in possible_states_set:
+                issues.append(
+                    ValidationIssue(f"Transition function not valid: '{value[0]}' is not in possible states", key)
+                )
+
+            if symbol_read not in alphabet_set:
+                issues.append(ValidationIssue(f"Transition function not valid: '{key[1]}' is not in alphabet", key))
+
+            if new_symbol not in alphabet_set:
+                issues.append(ValidationIssue(f"Transition function not valid: '{value[1]}' is not in alphabet", key))
+
+            if direction not in directions:
+                issues.append(
+                    ValidationIssue(f"Transition function not valid: direction indicator '{value[2]}' is invalid", key)
+                )
+
+        return issues
+
+    def missing_transitions(
+        self,
+        possible_states: tuple | list,
+        alphabet: tuple | list,
+        final_states: tuple | list,
+    ) -> Generator["ValidationIssue"]:
+        """Yields the (state, symbol) pairs of the non-final states with no transition defined, as issues which
+        aren't errors (the computation only fails if it ever needs them)
+        They are only listed when asked for, as a sparse machine can have many more of them than transitions"""
+        final_states_set = set(final_states)
+        for state in possible_states:
+            if state in final_states_set:
+                continue
+            for symbol in alphabet:
+                if (state, symbol) not in self.transition_function:
+                    yield ValidationIssue(
+                        f"Transition function incomplete: no transition for state '{state}' with symbol '{symbol}'",
+                        (state, symbol),
+                        is_error=False,
+                    )
+
+    def verify_validity(
+        self,
+        possible_states: tuple | list,
+        alphabet: tuple | list,
+        final_states: tuple | list,
+    ):
+        """Raises an InvalidTuringMachineError listing every error if the transition function isn't in the right format
+        - doesn't return anything"""
+        errors = self.validate(possible_states, alphabet, final_states)
+        if errors:
+            raise InvalidTuringMachineError(errors)
+
+
+class CompiledTuringMachine:
+    """
+    Integer-interned form of a Turing machine's transition function, used as its execution engine:
+    states and symbols are mapped to small ints once, and the transition function is flattened into a list
+    indexed by state_id * number_of_symbols + symbol_id, whose entries are
+    (index of the next state's first entry, symbol id to write, head delta)
+
+    The blank symbol is always interned as 0, so that freshly allocated cells are blank
+    """
+
+    budget_check_interval = BUDGET_CHECK_INTERVAL
+
+    def __init__(
+        self,
+        transition_function: TransitionFunction,
+        possible_states: tuple | list,
+        final_states: tuple | list,
+        alphabet: tuple | list,
+        blank_symbol: str,
+    ):
+        self.states = list(possible_states)
+        self.state_ids = {state: state_id for state_id, state in enumerate(self.states)}
+        self.symbols = [blank_symbol] + [symbol for symbol in alphabet if symbol != blank_symbol]
+        self.symbol_ids = {symbol: symbol_id for symbol_id, symbol in enumerate(self.symbols)}
+        self.number_of_symbols = len(self.symbols)
+        self.final_state_ids = frozenset(self.state_ids[state] for state in final_states)
+
+        # Final states have no entries, so halting is detected like an undefined transition
+        self.table: list = [None] * (len(self.states) * self.number_of_symbols)
+        for key, value in transition_function.as_dict().items():
+            start_state, symbol_read = key
+            new_state, new_symbol, direction = value
+            self.table[self.row(self.state_ids[start_state]) + self.symbol_ids[symbol_read]] = (
+                self.row(self.state_ids[new_state]),
+                self.symbol_ids[new_symbol],
+                HEAD_DELTAS[direction],
+            )
+
+    def row(self, state_id: int) -> int:
+        """Returns the index of the first entry of a state in the flattened table"""
+        return state_id * self.number_of_symbols
+
+    def undefined_transition(self, state_id: int, symbol_id: int) -> TuringMachineError:
+        """Returns the error raised when no transition is defined for a state and a symbol"""
+        return TuringMachineError(
+            f"Turing machine entered a state undefined by the transition function,"
+            f"in state '{self.states[state_id]} with symbol {self.symbols[symbol_id]}"
+        )
+
+    def run(self, state: str, tape: Tape, head_position: int, num_step: int, max_steps: int) -> tuple[str, int, int]:
+        """Runs the machine from the given configuration until it reaches a final state, or until num_step reaches max_steps
+        The tape is updated in place, and the new (state, head_position, num_step) is returned"""
+        if self.state_ids[state] in self.final_state_ids or num_step >= max_steps:
+            return state, head_position, num_step
+
+        # The computation is performed directly on the tape's cells, which must use the machine's symbol ids
+        position = tape.reserve(head_position)
+        cells = tape.cells
+        size = len(cells)
+
+        # lowest and highest are the bounds of the cells written so far, including the one under the head,
+        # unless it is about to be written for the first time at step extended_at
+        lowest = tape.lowest
+        highest = tape.highest
+        extended_at = None
+        if tape.is_empty():
+            lowest = highest = position
+            extended_at = num_step
+
+        table = self.table
+        row = self.row(self.state_ids[state])
+        try:
+            for num_step in range(num_step, max_steps):
+                if position < lowest:
+                    if position < 0:  # the tape grows (amortized) to the left
+                        shift = tape.grow_left()
+                        position += shift
+                        highest += shift
+                        size = len(cells)
+                    lowest = position
+                    extended_at = num_step
+                elif position > highest:
+                    if position >= size:  # the tape grows (amortized) to the right
+                        tape.grow_right()
+                        size = len(cells)
+                    highest = position
+                    extended_at = num_step
+
+                row, cells[position], delta = table[row + cells[position]]
+                position += delta
+            else:
+                num_step = max_steps
+
+        except TypeError:
+            # The entry is None: the machine halted, or no transition is defined for this state and symbol
+            if extended_at == num_step:  # the cell under the head wasn't actually written
+                if position == lowest:
+                    lowest += 1
+                else:
+                    highest -= 1
+            if row // self.number_of_symbols not in self.final_state_ids:
+                raise self.undefined_transition(row // self.number_of_symbols, cells[position])
+
+        finally:  # the tape bounds are updated even if the computation fails
+            tape.lowest = lowest
+            tape.highest = highest
+
+        return self.states[row // self.number_of_symbols], position - tape.origin, num_step
+
+    def run_counted(
+        self,
+        state: str,
+        tape: Tape,
+        head_position: int,
+        num_step: int,
+        max_steps: int,
+        hits: list[int],
+        visits: list[int],
+    ) -> tuple[str, int, int]:
+        """Same as run, each step being counted: hits[i] is the number of times the entry i of the table was used,
+        and visits[i] the number of steps the head spent on tape.cells[i] (visits is padded like the cells as they grow)
+        It's a loop of its own, so that run doesn't pay for the counters"""
+        if self.state_ids[state] in self.final_state_ids or num_step >= max_steps:
+            return state, head_position, num_step
+
+        position = tape.reserve(head_position)
+        cells = tape.cells
+        size = len(cells)
+
+        lowest = tape.lowest
+        highest = tape.highest
+        extended_at = None
+        if tape.is_empty():
+            lowest = highest = position
+            extended_at = num_step
+
+        table = self.table
+        row = self.row(self.state_ids[state])
+        try:
+            for num_step in range(num_step, max_steps):
+                if position < lowest:
+                    if position < 0:
+                        shift = tape.grow_left()
+                        position += shift
+                        highest += shift
+                        size = len(cells)
+                        visits[0:0] = [0] * shift
+                    lowest = position
+                    extended_at = num_step
+                elif position > highest:
+                    if position >= size:
+                        tape.grow_right()
+                        size = len(cells)
+                        visits.extend([0] * (size - len(visits)))
+                    highest = position
+                    extended_at = num_step
+
+                index = row + cells[position]
+                row, cells[position], delta = table[index]
+                hits[index] += 1
+                visits[position] += 1
+                position += delta
+            else:
+                num_step = max_steps
+
+        except TypeError:
+            if extended_at == num_step:
+                if position == lowest:
+                    lowest += 1
+                else:
+                    highest -= 1
+            if row // self.number_of_symbols not in self.final_state_ids:
+                raise self.undefined_transition(row // self.number_of_symbols, cells[position])
+
+        finally:
+            tape.lowest = lowest
+            tape.highest = highest
+
+        return self.states[row // self.number_of_symbols], position - tape.origin, num_step
 
-            if start_state in final_states:
-                raise TuringMachineError(f"Transition function not valid: state '{key[0]}' is a final state")
 
-            if start_state not in possible_states:
-                raise TuringMachineError(f"Transition function not valid: '{key[0]}' not in possible states")
+class Loop:
+    """
+    A proof that a computation never halts:
+
+    kind: REPEATED_CONFIGURATION or TRANSLATED_CYCLE
+    start: the step from which the machine repeats itself
+    period: the number of steps after which it repeats itself
+    shift: the number of cells the repeated behaviour moves by each period (negative to the left)
+    """
+
+    REPEATED_CONFIGURATION = "repeated configuration"
+    TRANSLATED_CYCLE = "translated cycle"
+
+    def __init__(self, kind: str, start: int, period: int, shift: int = 0):
+        self.kind = kind
+        self.start = start
+        self.period = period
+        self.shift = shift
+
+    def __str__(self) -> str:
+        if self.kind == Loop.REPEATED_CONFIGURATION:
+            return f"as the configuration of step {self.start} is repeated every {self.period} steps"
+        direction = "right" if self.shift > 0 else "left"
+        return (
+            f"as from step {self.start}, its behaviour is repeated every {self.period} steps, "
+            f"{abs(self.shift)} cells further to the {direction} on blank tape"
+        )
+
 
-            if new_state not in possible_states:
-                raise TuringMachineError(f"Transition function not valid: '{value[0]}' is not in possible states")
+@lru_cache(maxsize=ZOBRIST_HASHES_CACHED)
+def zobrist_hash(index: int, symbol_id: int) -> int:
+    """Returns the contribution of a cell to the hash of a tape, blank cells having none
+    It is a 64-bit mix (splitmix64) of the cell, as hash((index, symbol_id)) gives some cells the same contribution
+    (hash(-1) == hash(-2)), which then cancel each other out, and make repeated configurations be found wrongly"""
+    if not symbol_id:
+        return 0
+    x = (index * 0x9E3779B97F4A7C15 + symbol_id * 0xC2B2AE3D27D4EB4F) & ZOBRIST_MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & ZOBRIST_MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & ZOBRIST_MASK
+    return x ^ (x >> 31)
 
-            if symbol_read not in alphabet:
-                raise TuringMachineError(f"Transition function not valid: '{key[1]}' is not in alphabet")
 
-            if new_symbol not in alphabet:
-                raise TuringMachineError(f"Transition function not valid: '{value[1]}' is not in alphabet")
+class LoopDetector:
+    """
+    Watches a computation run by a compiled machine step by step, to prove it never halts:
+    * a repeated configuration is found by hashing (state, head position, tape) at each step, the hash of the tape
+      being updated with the cell written, and is then verified exactly by replaying the computation
+    * a translated cycle is found when the head reaches cells never written in the same state as a previous time,
+      and the cells visited in between have the same contents, shifted
+    """
 
-            if direction not in (GO_LEFT_SYMBOL, GO_RIGHT_SYMBOL, STAY_IN_PLACE_SYMBOL):
-                raise TuringMachineError(f"Transition function not valid: direction indicator '{value[2]}' is invalid")
+    def __init__(self, compiled: CompiledTuringMachine, state: str, tape: Tape, head_position: int, num_step: int):
+        self.compiled = compiled
+        self.initial_configuration = (state, tape.copy(), head_position, num_step)
+        self.first_step = num_step
+        self.head_positions = []  # head_positions[i] is the head position at step first_step + i
+        self.configurations = {}  # (state, head position, tape hash) -> step
+        self.records = {1: {}, -1: {}}  # direction -> state -> list of (step, head position, cells behind the head)
+
+        self.tape_hash = 0
+        for index in range(tape.lowest, tape.highest + 1):
+            self.tape_hash ^= zobrist_hash(index - tape.origin, tape.cells[index])
+
+    def run(self, state: str, tape: Tape, head_position: int, num_step: int, max_steps: int) -> tuple:
+        """Same as CompiledTuringMachine.run, except it returns (state, head_position, num_step, loop),
+        loop being None unless the computation was proven to never halt
+        The steps are taken directly from the compiled table, one at a time, so that each one can be watched"""
+        compiled = self.compiled
+        table = compiled.table
+        number_of_symbols = compiled.number_of_symbols
+        row = compiled.row(compiled.state_ids[state])
+        while num_step < max_steps:
+            position = head_position + tape.origin
+            cells = tape.cells
+            if not 0 <= position < len(cells):
+                position = tape.reserve(head_position)
+                cells = tape.cells
+            symbol_read = cells[position]
+            entry = table[row + symbol_read]
+            if entry is None:  # the machine halted, or no transition is defined for this state and symbol
+                if row // number_of_symbols not in compiled.final_state_ids:
+                    raise compiled.undefined_transition(row // number_of_symbols, symbol_read)
+                break
+
+            loop = self.watch(state, tape, head_position, num_step)
+            if loop is not None:
+                return state, head_position, num_step, loop
+
+            # the cell under the head is written, like in CompiledTuringMachine.run
+            if tape.lowest > tape.highest:  # the tape is empty
+                tape.lowest = tape.highest = position
+            elif position < tape.lowest:
+                tape.lowest = position
+            elif position > tape.highest:
+                tape.highest = position
+
+            row, symbol_written, delta = entry
+            if symbol_written != symbol_read:
+                cells[position] = symbol_written
+                self.tape_hash ^= zobrist_hash(head_position, symbol_read) ^ zobrist_hash(head_position, symbol_written)
+            head_position += delta
+            num_step += 1
+            state = compiled.states[row // number_of_symbols]
+
+        return state, head_position, num_step, None
+
+    def watch(self, state: str, tape: Tape, head_position: int, num_step: int) -> Loop | None:
+        """Records the configuration of the given step, and returns a Loop if it proves the computation never halts"""
+        self.head_positions.append(head_position)
+
+        key = (state, head_position, self.tape_hash)
+        if key in self.configurations:
+            start = self.configurations[key]
+            if self.is_repetition(start, num_step):
+                return Loop(Loop.REPEATED_CONFIGURATION, start=start, period=num_step - start)
+        else:
+            self.configurations[key] = num_step
+
+        # The head is on a cell never written if it is beyond the written ones
+        cell_index = head_position + tape.origin
+        is_empty = tape.lowest > tape.highest
+        if is_empty or cell_index > tape.highest:
+            loop = self.check_record(1, state, tape, head_position, num_step)
+            if loop is not None:
+                return loop
+        if is_empty or cell_index < tape.lowest:
+            loop = self.check_record(-1, state, tape, head_position, num_step)
+            if loop is not None:
+                return loop
+        return None
+
+    def is_repetition(self, start: int, stop: int) -> bool:
+        """Verifies the configurations of steps start and stop are the same, by replaying the computation"""
+        state, tape, head_position, num_step = self.initial_configuration
+        tape = tape.copy()
+        state, head_position, num_step = self.compiled.run(state, tape, head_position, num_step, max_steps=start)
+        configuration = (state, head_position, tape.contents())
+        state, head_position, num_step = self.compiled.run(state, tape, head_position, num_step, max_steps=stop)
+        return configuration == (state, head_position, tape.contents())
+
+    def check_record(self, direction: int, state: str, tape: Tape, head_position: int, num_step: int) -> Loop | None:
+        """Compares the head reaching new cells in the given direction with the previous times it did in the same state"""
+        records = self.records[direction].setdefault(state, [])
+        for record_step, record_head_position, record_cells in reversed(records):
+            # The cells visited since the record must have the same contents now, shifted
+            positions = self.head_positions[record_step - self.first_step : num_step - self.first_step + 1]
+            depth = (
+                (record_head_position - min(positions)) if direction == 1 else (max(positions) - record_head_position)
+            )
+            if depth >= TRANSLATED_CYCLE_WINDOW:
+                continue
+
+            if direction == 1:
+                same_contents = record_cells[-depth - 1 :] == tape.window(head_position - depth, head_position + 1)
+            else:
+                same_contents = record_cells[: depth + 1] == tape.window(head_position, head_position + depth + 1)
+            if same_contents:
+                return Loop(
+                    Loop.TRANSLATED_CYCLE,
+                    start=record_step,
+                    period=num_step - record_step,
+                    shift=head_position - record_head_position,
+                )
+
+        if direction == 1:
+            cells = tape.window(head_position - TRANSLATED_CYCLE_WINDOW + 1, head_position + 1)
+        else:
+            cells = tape.window(head_position, head_position + TRANSLATED_CYCLE_WINDOW)
+        records.append((num_step, head_position, cells))
+        del records[:-TRANSLATED_CYCLE_CANDIDATES]
+        return None
+
+
+class Configuration:
+    """
+    The state of a single computation, kept apart from the machine's definition so that a machine can run several:
+
+    state: the current state
+    tape: the tape, using the symbol ids of the machine's compiled form
+    head_position: the index of the cell under the head
+    num_step: the number of the next step, starting at 1
+    """
+
+    def __init__(self, state: str, tape: Tape, head_position: int = 0, num_step: int = 1):
+        self.state = state
+        self.tape = tape
+        self.head_position = head_position
+        self.num_step = num_step
+
+    def get_tape(self) -> str:
+        return self.tape.render_with_pos_indicator(head_position=self.head_position)
+
+
+class StepTrace:
+    """
+    The steps of a computation shown when all its steps are traced, None meaning no restriction:
+
+    every: only one step out of every is shown, starting from the first one
+    state_changes: if True, only the steps in which the state differs from the one of the previous step are shown
+    last: only the last steps shown are kept, and shown at the end of the computation
+    window: the number of cells shown around the head, instead of the whole tape
+    """
+
+    def __init__(
+        self, every: int | None = None, state_changes: bool = False, last: int | None = None, window: int | None = None
+    ):
+        self.every = every
+        self.state_changes = state_changes
+        self.last = last
+        self.window = window
+
+    def shows(self, num_step: int, state: str, previous_state: str | None) -> bool:
+        """Returns True if the step is shown"""
+        if self.every is not None and (num_step - 1) % self.every:
+            return False
+        return not self.state_changes or state != previous_state
+
+    def steps_to_next(self, num_step: int) -> int:
+        """Returns the number of steps that can be run at once before the next step that may be shown"""
+        if self.state_changes or self.last is not None or self.every is None:
+            return 1
+        return self.every - (num_step - 1) % self.every
+
+    def render(self, num_step: int, state: str, tape: Tape, head_position: int) -> str:
+        if self.window is None:
+            rendered_tape = tape.render_with_pos_indicator(head_position=head_position)
+        else:
+            rendered_tape = tape.render_window(head_position, self.window)
+        return f"Step {num_step}, with state '{state}':\n{rendered_tape}\n"
+
+
+class StepBuffer:
+    """
+    Ring buffer of the last steps shown by a trace, which are only rendered at the end of the computation:
+
+    steps: the (num_step, state, head_position, lowest, highest) of the last steps shown,
+    lowest and highest being the bounds of the tape at that step (relative to its origin)
+    writes: the (num_step, position, previous symbol id) of each step since the oldest step kept,
+    used to get back the tape of each step from the current one
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.steps = deque()
+        self.writes = deque()
+
+    def record_step(self, configuration: Configuration):
+        c = configuration
+        self.steps.append(
+            (c.num_step, c.state, c.head_position, c.tape.lowest - c.tape.origin, c.tape.highest - c.tape.origin)
+        )
+        if len(self.steps) > self.size:
+            self.steps.popleft()
+            while self.writes and self.writes[0][0] < self.steps[0][0]:
+                self.writes.popleft()
+
+    def record_write(self, configuration: Configuration):
+        """Records the cell under the head, before the step of the configuration is run"""
+        c = configuration
+        if self.steps:
+            index = c.head_position + c.tape.origin
+            symbol_id = c.tape.cells[index] if 0 <= index < len(c.tape.cells) else 0
+            self.writes.append((c.num_step, c.head_position, symbol_id))
+
+    def render(self, trace: StepTrace, tape: Tape) -> list[str]:
+        """Returns the steps kept, rendered from the current tape by undoing the writes of the steps after them"""
+        tape = tape.copy()
+        writes = list(self.writes)
+        rendered_steps = []
+        for num_step, state, head_position, lowest, highest in reversed(self.steps):
+            while writes and writes[-1][0] >= num_step:
+                _, position, symbol_id = writes.pop()
+                tape.cells[tape.reserve(position)] = symbol_id
+            tape.lowest = lowest + tape.origin
+            tape.highest = highest + tape.origin
+            rendered_steps.append(trace.render(num_step, state, tape, head_position))
+        return rendered_steps[::-1]
 
 
 class TuringMachine:
@@ -171,24 +921,45 @@ class TuringMachine:
         blank_symbol: str,
     ):
 
-        # We test the given values to see if they're correct/valid
+        # We test the given values to see if they're correct/valid, collecting every problem found
+        issues = []
+        possible_states_set = set(possible_states)
 
         if not blank_symbol in alphabet:  # we verify blank_symbol is valid
-            raise TuringMachineError(f"Blank symbol chosen '{blank_symbol}' isn't in alphabet")
+            issues.append(
+                ValidationIssue(f"Blank symbol chosen '{blank_symbol}' isn't in alphabet", ValidationIssue.BLANK_SYMBOL)
+            )
 
-        if not initial_state in possible_states:  # we verify initial_state in valid
-            raise TuringMachineError(f"Initial state '{initial_state}' isn't in possible states")
+        if not initial_state in possible_states_set:  # we verify initial_state in valid
+            issues.append(
+                ValidationIssue(
+                    f"Initial state '{initial_state}' isn't in possible states", ValidationIssue.INITIAL_STATE
+                )
+            )
 
         for state in final_states:  # we verify final_states is valid
-            if not state in possible_states:
-                raise TuringMachineError(f"Invalid final state: '{state}' not in possible states")
+            if not state in possible_states_set:
+                issues.append(
+                    ValidationIssue(
+                        f"Invalid final state: '{state}' not in possible states", ValidationIssue.FINAL_STATES
+                    )
+                )
 
         self.transition_function = TransitionFunction(transition_function)
-        self.transition_function.verify_validity(
+        issues += self.transition_function.validate(
             possible_states=possible_states,
             alphabet=alphabet,
             final_states=final_states,
         )
+        if issues:
+            raise InvalidTuringMachineError(issues)
+        self.compiled = CompiledTuringMachine(
+            self.transition_function,
+            possible_states=possible_states,
+            final_states=final_states,
+            alphabet=alphabet,
+            blank_symbol=blank_symbol,
+        )
 
         # Set the values for the alphabet, the possible states, etc...
         self.name = name
@@ -199,26 +970,71 @@ class TuringMachine:
         self.initial_state = initial_state
 
         # Initialise the Turing machine
-        self.state = initial_state
-        self.head_position = 0
-        self.tape = Tape(
-            starting_configuration="", blank_symbol=blank_symbol
+        self.configuration = Configuration(
+            initial_state, Tape(starting_configuration="", blank_symbol=blank_symbol, symbols=self.compiled.symbols)
         )  # We don't precise the starting tape; it will be initialised later on
 
-    def get_formal_definition(self) -> str:
+    # The state, tape and head position of the machine are the ones of its current configuration
+    @property
+    def state(self) -> str:
+        return self.configuration.state
+
+    @state.setter
+    def state(self, state: str):
+        self.configuration.state = state
+
+    @property
+    def tape(self) -> Tape:
+        return self.configuration.tape
+
+    @tape.setter
+    def tape(self, tape: Tape):
+        self.configuration.tape = tape
+
+    @property
+    def head_position(self) -> int:
+        return self.configuration.head_position
+
+    @head_position.setter
+    def head_position(self, head_position: int):
+        self.configuration.head_position = head_position
+
+    def missing_transitions(self) -> Generator[ValidationIssue]:
+        """Yields the (state, symbol) pairs of the non-final states with no transition defined"""
+        return self.transition_function.missing_transitions(self.possible_states, self.alphabet, self.final_states)
+
+    def get_formal_definition(self, start: int = 0, stop: int | None = None) -> str:
         """Returns a string representation of the machine's definition"""
+        return "\n".join(self.formal_definition_chunks(start, stop))
+
+    def formal_definition_chunks(self, start: int = 0, stop: int | None = None) -> Generator[str, None, None]:
+        """Yields the machine's definition in chunks to be joined by newlines, the transition table being written
+        TABLE_CHUNK_LINES lines at a time, with only the transitions start to stop if they are given"""
+        number_of_transitions = len(self.transition_function.as_dict())
+        if start or stop is not None:
+            last = number_of_transitions if stop is None else min(stop, number_of_transitions)
+            shown = f"transitions {start + 1} to {last} of {number_of_transitions}"
+            table_description = f"represented as the following table ({shown}):"
+        else:
+            table_description = "represented as the following table:"
+
         output = ""
         output += f"Turing machine '{self.name}' defined with:\n"
         output += f"* Set of states 𝙌 = {set(self.possible_states)}\n"
         output += f"* Initial state 𝙦₀ = '{self.initial_state}'\n"
         output += f"* Set of final/accepting states 𝙁 = {set(self.final_states) if self.final_states else "∅"}\n"  # we represent set() as ∅
         output += f"* Alphabet 𝜞 = {set(self.alphabet)} with blank symbol 𝑩 = '{self.blank_symbol}'\n"
-        output += "* Transition function 𝛿 : (𝙌 ∖ 𝙁) × 𝙁 → 𝙌 × 𝙁 × {L, R, N}, represented as the following table:\n\n"
-        output += self.transition_function.transition_table()
-        return output
+        output += f"* Transition function 𝛿 : (𝙌 ∖ 𝙁) × 𝙁 → 𝙌 × 𝙁 × {{L, R, N}}, {table_description}\n"
+        yield output
 
-    def get_transition_diagram(self) -> graphviz.Digraph:
+        lines = self.transition_function.transition_table_lines(start=start, stop=stop)
+        while chunk := list(islice(lines, TABLE_CHUNK_LINES)):
+            yield "\n".join(chunk)
+
+    def get_transition_diagram(self) -> "graphviz.Digraph":
         """Returns the Turing machine's definition as a transition diagram"""
+        import graphviz
+
         transition_diagram_output = graphviz.Digraph(
             filename=f"transition_diagram_{self.name.replace(" ", "_")}",
             graph_attr={
@@ -231,32 +1047,36 @@ class TuringMachine:
         transition_diagram_output.node("start", shape="plaintext")
         transition_diagram_output.edge("start", self.initial_state)
 
+        # the transitions between the same two states are drawn as a single edge, with one label line each
+        edge_labels = {}
         for key, value in self.transition_function.as_dict().items():
             start_state = key[0]
             symbol_read = key[1]
             new_state = value[0]
             new_symbol = value[1]
             direction = value[2]
+            edge_labels.setdefault((start_state, new_state), []).append(f"{symbol_read}, {new_symbol}, {direction}")
 
-            if new_state in self.final_states:
-                transition_diagram_output.node(new_state, shape="doublecircle")
+        for final_state in sorted({new_state for _, new_state in edge_labels if new_state in self.final_states}):
+            transition_diagram_output.node(final_state, shape="doublecircle")
 
-            transition_diagram_output.edge(
-                start_state,
-                new_state,
-                label=f"{symbol_read}, {new_symbol}, {direction}",
-            )
+        for (start_state, new_state), labels in edge_labels.items():  # \n is a line break in DOT labels
+            transition_diagram_output.edge(start_state, new_state, label="\\n".join(labels))
 
         return transition_diagram_output
 
-    def initialise_computation(self, starting_tape: str):
+    def new_configuration(self, starting_tape: str) -> Configuration:
+        """Returns the starting configuration of a computation, without changing the machine's current one"""
         for char in starting_tape:  # we verify starting_tape is valid
-            if not char in self.alphabet:
+            if not char in self.compiled.symbol_ids:
                 raise TuringMachineError(f"Invalid starting tape: symbol '{char}' not in alphabet")
 
-        self.tape = Tape(starting_tape, blank_symbol=self.blank_symbol)
-        self.head_position = 0
-        self.state = self.initial_state
+        return Configuration(
+            self.initial_state, Tape(starting_tape, blank_symbol=self.blank_symbol, symbols=self.compiled.symbols)
+        )
+
+    def initialise_computation(self, starting_tape: str):
+        self.configuration = self.new_configuration(starting_tape)
 
     def get_tape(self) -> str:
         return self.tape.render_with_pos_indicator(head_position=self.head_position)
@@ -284,26 +1104,167 @@ class TuringMachine:
     def in_final_state(self):
         return self.state in self.final_states
 
-    def perform_computation_from_tape(self, starting_tape: str, all_steps: bool = False) -> Generator[str]:
+    def perform_computation_from_tape(
+        self,
+        starting_tape: str,
+        all_steps: bool = False,
+        budget: RunBudget | None = None,
+        loop_detection_steps: int = LOOP_DETECTION_STEPS,
+        engine=None,
+        trace: StepTrace | None = None,
+        recorder=None,
+        checkpointer=None,
+    ) -> Generator[str]:
         """Returns a generator that yields formatted string for each step of the computation
-        if all_steps is set to False, the ouput only contains the final result
-        after MAX_NUMBER_OF_STEPS steps, the program will assume the machine is caught in an infinite loop"""
-
+        if all_steps is set to False, the ouput only contains the final result,
+        the first loop_detection_steps steps are watched to prove the machine never halts,
+        and the rest of the computation is run by engine (by default, the compiled machine)
+        otherwise, trace selects the steps shown (by default, all of them)
+        if a recorder (a trace_file.TraceWriter) is given, every step is recorded to its binary trace file
+        if a checkpointer (a checkpoint.Checkpointer) is given, the computation is resumed from its last checkpoint,
+        if there is one, and the configuration is saved regularly and when the budget is exceeded
+        when the computation exceeds its budget (by default, MAX_NUMBER_OF_STEPS steps),
+        the program will assume the machine is caught in an infinite loop"""
         self.initialise_computation(starting_tape=starting_tape)
-        num_step = 1
-        infinite_loop = False
-        while not self.in_final_state():
-            if num_step >= MAX_NUMBER_OF_STEPS:
-                infinite_loop = True
-                yield f"The Turing machine seems to be caught in an infinite loop. After {num_step} steps, the tape is:\n{self.get_tape()}"
+        if checkpointer is not None:
+            self.configuration = checkpointer.load(self, starting_tape) or self.configuration
+        return self.compute(
+            self.configuration,
+            starting_tape,
+            all_steps=all_steps,
+            budget=budget,
+            loop_detection_steps=loop_detection_steps,
+            engine=engine,
+            trace=trace,
+            recorder=recorder,
+            checkpointer=checkpointer,
+        )
+
+    def compute(
+        self,
+        configuration: Configuration,
+        starting_tape: str,
+        all_steps: bool = False,
+        budget: RunBudget | None = None,
+        loop_detection_steps: int = LOOP_DETECTION_STEPS,
+        engine=None,
+        trace: StepTrace | None = None,
+        recorder=None,
+        checkpointer=None,
+    ) -> Generator[str]:
+        """Same as perform_computation_from_tape, except the computation goes on from the given configuration,
+        which is the only thing updated: the machine itself isn't changed"""
+        if budget is None:
+            budget = RunBudget()
+        if recorder is not None:  # the recorder runs every step, none of them being skipped by the loop detector
+            recorder.start(configuration)
+            try:
+                yield from self.compute(
+                    configuration,
+                    starting_tape,
+                    budget=budget,
+                    loop_detection_steps=0,
+                    engine=recorder,
+                    checkpointer=checkpointer,
+                )
+            finally:
+                recorder.close()
+            return
+        if engine is None:
+            engine = self.compiled
+        if all_steps:
+            yield from self.trace_computation(configuration, starting_tape, budget, trace or StepTrace())
+            return
+
+        c = configuration
+        start_time = time.perf_counter()
+        exceeded_budget = None
+        loop = None
+        loop_detector = LoopDetector(self.compiled, c.state, c.tape, c.head_position, c.num_step)
+        while not c.state in self.final_states:
+            exceeded_budget = budget.exceeded(c.num_step, start_time, c.tape)
+            if exceeded_budget is not None:
+                if checkpointer is not None:  # so that the computation can be resumed with a bigger budget
+                    checkpointer.save(c, starting_tape)
+                yield self.exceeded_budget_result(c, exceeded_budget)
                 break
-            if all_steps:
-                yield f"Step {num_step}, with state '{self.state}':\n{self.get_tape()}\n"
-            self.step()
-            num_step += 1
+            if checkpointer is not None:
+                checkpointer.save_if_due(c, starting_tape)
+            if c.num_step < loop_detection_steps:
+                c.state, c.head_position, c.num_step, loop = loop_detector.run(
+                    c.state,
+                    c.tape,
+                    c.head_position,
+                    num_step=c.num_step,
+                    max_steps=min(budget.next_check(c.num_step), loop_detection_steps),
+                )
+                if loop is not None:
+                    yield f"The Turing machine '{self.name}' never halts from input '{starting_tape}', {loop}. After {c.num_step} steps, the tape is:\n{c.get_tape()}"
+                    break
+            else:  # without intermediate steps, the engine runs the computation until the next budget check
+                c.state, c.head_position, c.num_step = engine.run(
+                    c.state,
+                    c.tape,
+                    c.head_position,
+                    num_step=c.num_step,
+                    max_steps=budget.next_check(c.num_step, engine.budget_check_interval),
+                )
 
-        if not infinite_loop:
-            yield f"Turing machine '{self.name}' halted on state '{self.state}' from input '{starting_tape}' after {num_step} steps, with final tape:\n{self.get_tape()}"
+        if exceeded_budget is None and loop is None:
+            yield self.halted_result(c, starting_tape)
+
+    def trace_computation(
+        self, configuration: Configuration, starting_tape: str, budget: RunBudget, trace: StepTrace
+    ) -> Generator[str]:
+        """Same as compute with all_steps, the steps shown being selected by trace
+        The steps which can't be shown are run at once by the compiled machine"""
+        c = configuration
+        start_time = time.perf_counter()
+        exceeded_budget = None
+        buffer = StepBuffer(trace.last) if trace.last is not None else None
+        previous_state = None
+        try:
+            while not c.state in self.final_states:
+                exceeded_budget = budget.exceeded(c.num_step, start_time, c.tape)
+                if exceeded_budget is not None:
+                    break
+                if trace.shows(c.num_step, c.state, previous_state):
+                    if buffer is None:
+                        yield trace.render(c.num_step, c.state, c.tape, c.head_position)
+                    else:
+                        buffer.record_step(c)
+                if buffer is not None:
+                    buffer.record_write(c)
+                previous_state = c.state
+                c.state, c.head_position, c.num_step = self.compiled.run(
+                    c.state,
+                    c.tape,
+                    c.head_position,
+                    num_step=c.num_step,
+                    max_steps=min(c.num_step + trace.steps_to_next(c.num_step), budget.next_check(c.num_step)),
+                )
+
+        except TuringMachineError:  # the last steps are still shown
+            if buffer is not None:
+                yield from buffer.render(trace, c.tape)
+            raise
+
+        if buffer is not None:
+            yield from buffer.render(trace, c.tape)
+        if exceeded_budget is not None:
+            yield self.exceeded_budget_result(c, exceeded_budget)
+        else:
+            yield self.halted_result(c, starting_tape)
+
+    def exceeded_budget_result(self, configuration: Configuration, exceeded_budget: str) -> str:
+        """Returns the result of a computation stopped as it exceeded its budget"""
+        c = configuration
+        return f"The Turing machine seems to be caught in an infinite loop: it exceeded its {exceeded_budget}. After {c.num_step} steps, the tape is:\n{c.get_tape()}"
+
+    def halted_result(self, configuration: Configuration, starting_tape: str) -> str:
+        """Returns the result of a computation that reached a final state"""
+        c = configuration
+        return f"Turing machine '{self.name}' halted on state '{c.state}' from input '{starting_tape}' after {c.num_step} steps, with final tape:\n{c.get_tape()}"
 
 
 class SimplifiedTuringMachine(TuringMachine):
@@ -313,25 +1274,24 @@ class SimplifiedTuringMachine(TuringMachine):
     """
 
     def __init__(self, name, transition_function, initial_state, final_states, blank_symbol):
-        alphabet = []
-        possible_states = []
+        alphabet = set()
+        possible_states = set()
 
         for key, value in transition_function.items():
             start_state = key[0]
             symbol_read = key[1]
             new_state = value[0]
             new_symbol = value[1]
-            direction = value[2]
 
-            alphabet.append(symbol_read)
-            alphabet.append(new_symbol)
+            alphabet.add(symbol_read)
+            alphabet.add(new_symbol)
 
-            possible_states.append(start_state)
-            possible_states.append(new_state)
+            possible_states.add(start_state)
+            possible_states.add(new_state)
 
-        # we then remove duplicates
-        alphabet = sorted(list(set(alphabet)))
-        possible_states = sorted(list(set(possible_states)))
+        # the sets remove duplicates, and are then sorted so that the machine is always the same
+        alphabet = sorted(alphabet)
+        possible_states = sorted(possible_states)
 
         super().__init__(
             name=name,
@@ -342,3 +1302,100 @@ class SimplifiedTuringMachine(TuringMachine):
             alphabet=alphabet,
             blank_symbol=blank_symbol,
         )
+
+    def minimize(self) -> "Minimization":
+        """Returns the machine without the states unreachable from the initial state, and with the states behaving
+        the same way merged (by partition refinement), along with what was removed
+        Final states and states with undefined transitions are never merged, as their names appear in the results,
+        and the alphabet is kept, so the minimized machine halts or fails the same way from any starting tape"""
+        transitions = self.transition_function.as_dict()
+
+        successors = {}
+        for (state, _), (new_state, _, _) in transitions.items():
+            successors.setdefault(state, []).append(new_state)
+        reachable = {self.initial_state}
+        stack = [self.initial_state]
+        while stack:
+            for new_state in successors.get(stack.pop(), ()):
+                if new_state not in reachable:
+                    reachable.add(new_state)
+                    stack.append(new_state)
+
+        # Each state starts in the block 0 if it may be merged, and in a block of its own otherwise;
+        # blocks are then split according to the block reached by each symbol, until none can be split anymore
+        mergeable = [
+            state
+            for state in sorted(reachable)
+            if state not in self.final_states and all((state, symbol) in transitions for symbol in self.alphabet)
+        ]
+        block = {state: number for number, state in enumerate(sorted(reachable), 1)}
+        block.update((state, 0) for state in mergeable)
+        number_of_blocks = len(set(block.values()))
+        while True:
+            signatures = {}
+            split_block = dict(block)
+            for state in mergeable:
+                signature = [block[state]]
+                for symbol in self.alphabet:
+                    new_state, new_symbol, direction = transitions[(state, symbol)]
+                    signature += (block[new_state], new_symbol, direction)
+                split_block[state] = signatures.setdefault(tuple(signature), -len(signatures) - 1)
+            block = split_block
+            if len(set(block.values())) == number_of_blocks:
+                break
+            number_of_blocks = len(set(block.values()))
+
+        # The initial state is kept, or the first state of each block
+        kept = {}
+        for state in sorted(reachable, key=lambda state: state != self.initial_state):
+            kept.setdefault(block[state], state)
+        representative = {state: kept[block[state]] for state in reachable}
+
+        minimized_transitions = {
+            (state, symbol): (representative[new_state], new_symbol, direction)
+            for (state, symbol), (new_state, new_symbol, direction) in transitions.items()
+            if representative.get(state) == state
+        }
+        kept_states = sorted(kept.values())
+        turing_machine = TuringMachine(
+            name=self.name,
+            transition_function=minimized_transitions,
+            possible_states=kept_states,
+            initial_state=self.initial_state,
+            final_states=[state for state in self.final_states if state in reachable],
+            alphabet=self.alphabet,
+            blank_symbol=self.blank_symbol,
+        )
+        return Minimization(
+            turing_machine,
+            unreachable_states=sorted(set(self.possible_states) - reachable),
+            merged_states={state: kept_state for state, kept_state in representative.items() if state != kept_state},
+        )
+
+
+class Minimization:
+    """
+    The result of SimplifiedTuringMachine.minimize:
+
+    turing_machine: the minimized machine
+    unreachable_states: the states removed as they can't be reached from the initial state
+    merged_states: maps each state removed as it behaves like an other one to the state kept instead
+    """
+
+    def __init__(self, turing_machine: TuringMachine, unreachable_states: list, merged_states: dict):
+        self.turing_machine = turing_machine
+        self.unreachable_states = unreachable_states
+        self.merged_states = merged_states
+
+    def __str__(self) -> str:
+        if not self.unreachable_states and not self.merged_states:
+            return f"Turing machine '{self.turing_machine.name}' is already minimal"
+        number_of_states = len(self.turing_machine.possible_states)
+        removed = len(self.unreachable_states) + len(self.merged_states)
+        output = f"Turing machine '{self.turing_machine.name}' minimized from {number_of_states + removed} to {number_of_states} states:"
+        if self.unreachable_states:
+            output += f"\n* Unreachable states removed: {set(self.unreachable_states)}"
+        if self.merged_states:
+            merged = ", ".join(f"'{state}' into '{kept}'" for state, kept in sorted(self.merged_states.items()))
+            output += f"\n* States merged: {merged}"
+        return output
@@ -0,0 +1,138 @@
+from TMLang_interpreter import (
+    ExecutionContext,
+    execute_command,
+    define_machine,
+    read_lines,
+    is_blank,
+    get_separator,
+    evaluate_run_arguments,
+    END_TRANSITION_FUNCTION_KEYWORD,
+    RUN_BATCH_COMMAND,
+    RENDER_GRAPHICAL_TRANSITION_DIAGRAM_COMMAND,
+    CHECKPOINT_OPTION,
+    RECORD_OPTION,
+    OPTION_SEPARATOR,
+)
+from typing import Generator
+import os
+import time
+
+WATCH_INTERVAL = 0.5  # number of seconds between two checks of the file watched
+
+# commands writing files are always executed again, as the files may have been changed or deleted since
+FILE_WRITING_OPTIONS = (CHECKPOINT_OPTION, RECORD_OPTION)
+
+
+def file_version(path: str) -> tuple[int, int] | None:
+    """Returns the (modification time, size) of a file, which changes when it is written, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class WatchedProgram:
+    """
+    A TMLang program interpreted again each time its file changes, only redoing what the change affects:
+    the machine is only defined again if the lines defining it (up to endprogr) changed, and a command is only
+    executed again if it's new or changed, or if the machine or its input changed, its output being reused otherwise
+
+    path: the path of the file of the program
+    definition: the lines defining the machine, as they were when it was last defined
+    context: the ExecutionContext of the machine defined, None until a definition is valid
+    results: the output of the commands executed with this machine, and the machine displayed after them, by key
+    machine_defined, commands_executed, commands_reused: what the last interpretation did
+    """
+
+    def __init__(self, path: str, **settings):
+        """settings are the keyword arguments of ExecutionContext, other than the machine"""
+        self.path = path
+        self.settings = settings
+        self.definition = None
+        self.context = None
+        self.results = {}
+        self.machine_defined = False
+        self.commands_executed = 0
+        self.commands_reused = 0
+
+    def changes(self, interval: float = WATCH_INTERVAL) -> Generator[None]:
+        """Yields each time the file is written (and once at first), checking it every interval seconds"""
+        last_version = None
+        while True:
+            version = file_version(self.path)
+            # the file can briefly be missing while an editor replaces it
+            if version is not None and version != last_version:
+                last_version = version
+                yield
+            time.sleep(interval)
+
+    def result_key(self, code_line: str) -> tuple | None:
+        """Returns the key of the output of a command, which is the same as long as the output is,
+        or None if the command must always be executed again"""
+        if code_line.startswith(RENDER_GRAPHICAL_TRANSITION_DIAGRAM_COMMAND):
+            return None  # it writes files, and renders them from the diagram cache anyway
+        if any(word.startswith(name + OPTION_SEPARATOR) for word in code_line.split() for name in FILE_WRITING_OPTIONS):
+            return None
+        # the output of #printdef depends on whether #minimize was executed before
+        key = (code_line, self.context.displayed_machine is self.context.turing_machine)
+        if code_line.startswith(RUN_BATCH_COMMAND):
+            run_arguments = evaluate_run_arguments(code_line[len(RUN_BATCH_COMMAND) :].strip())
+            if run_arguments is not None:
+                key += (file_version(run_arguments[0]),)
+        return key
+
+    def interpret(self) -> Generator[str]:
+        """Interprets the program again, yielding its whole output"""
+        self.machine_defined = False
+        self.commands_executed = 0
+        self.commands_reused = 0
+        with open(self.path, "r") as file:
+            code_lines = list(read_lines(file))
+
+        end = next(
+            (i for i, (_, code_line) in enumerate(code_lines) if code_line == END_TRANSITION_FUNCTION_KEYWORD),
+            len(code_lines) - 1,
+        )
+        definition = [code_line for _, code_line in code_lines[: end + 1]]
+        if definition != self.definition:
+            self.context = None
+            self.results = {}
+            turing_machine, _ = define_machine(iter(code_lines))
+            self.context = ExecutionContext(turing_machine, **self.settings)
+            self.definition = definition
+            self.machine_defined = True
+        context = self.context
+        context.displayed_machine = context.turing_machine  # as #minimize may have been removed
+
+        is_first_action = True  # used for printing the separator correctly
+        for line_number, code_line in code_lines[end + 1 :]:
+            if not is_blank(code_line):
+
+                if not is_first_action:
+                    yield get_separator()
+
+                key = self.result_key(code_line)
+                if key in self.results:
+                    outputs, context.displayed_machine = self.results[key]
+                    self.commands_reused += 1
+                    yield from outputs
+                else:
+                    # the output is streamed as the command is executed, and only kept if it completes
+                    outputs = []
+                    self.commands_executed += 1
+                    for output in execute_command(context, line_number, code_line):
+                        outputs.append(output)
+                        yield output
+                    if key is not None:
+                        self.results[key] = (outputs, context.displayed_machine)
+
+                is_first_action = False
+
+    def summary(self) -> str:
+        """Returns what the last interpretation did"""
+        machine = "machine defined again" if self.machine_defined else "machine unchanged"
+        return (
+            f"[{time.strftime('%H:%M:%S')}] '{self.path}' interpreted ({machine}, {self.commands_executed} commands "
+            f"executed, {self.commands_reused} reused), watching for changes (Ctrl+C to stop)"
+        )